@@ -0,0 +1,37 @@
+import functools
+from packaging.version import Version
+from packaging.specifiers import SpecifierSet
+
+@functools.lru_cache(maxsize=8192)
+def V(version):
+    """
+    Parse a version string, once per process.
+
+    Args:
+        version (str): Version string to parse
+
+    Returns:
+        Version: The parsed version; the same object for every call with the same string
+
+    Raises:
+        packaging.version.InvalidVersion: If the string is not a valid version
+            (failures are not cached)
+    """
+    return Version(version)
+
+@functools.lru_cache(maxsize=8192)
+def S(specifier):
+    """
+    Parse a version specifier string, once per process.
+
+    Args:
+        specifier (str): Specifier string (e.g. ">=1.0,<2")
+
+    Returns:
+        SpecifierSet: The parsed specifier; the same object for every call with the same string
+
+    Raises:
+        packaging.specifiers.InvalidSpecifier: If the string is not a valid specifier
+            (failures are not cached)
+    """
+    return SpecifierSet(specifier)
@@ -1,8 +1,7 @@
 import subprocess
 import sys
 import json
-from packaging.version import Version
-from packaging.specifiers import SpecifierSet
+from _vercache import V as _ver, S as _spec
 
 def run_pipdeptree(package_name):
     cmd = f'pipdeptree -p "{package_name}" --json 2>/dev/null'
@@ -44,7 +43,7 @@ def main(package_name):
         
         # Dependency issue case
         try:
-            if Version(installed_version) not in SpecifierSet(required_version_spec):
+            if _ver(installed_version) not in _spec(required_version_spec):
                 dependency_issues.append(f"{dep_name}{required_version_spec}")
         except Exception as e:
             print(f"Error checking version for {dep_name}: {e}")
@@ -1,13 +1,13 @@
-import subprocess
 import sys
 import json
-from packaging.version import Version, InvalidVersion
-from packaging.specifiers import SpecifierSet
+from packaging.version import Version
+from pypi_versions import get_release_versions, get_parsed_release_versions, prefetch_versions
+from installed_packages import dependency_tree
+from _vercache import V as _ver, S as _spec
 
 def run_pipdeptree(package_name):
-    cmd = f'pipdeptree -p "{package_name}" --json 2>/dev/null'
-    output = subprocess.check_output(cmd, shell=True, text=True)
-    return json.loads(output)
+    """Build the pipdeptree JSON structure for the package from installed metadata."""
+    return dependency_tree(package_name)
 
 def get_package_info(data, package_name):
     for package_entry in data:
@@ -17,33 +17,14 @@ def get_package_info(data, package_name):
     return None
 
 def get_available_versions(package_name):
-    """Use pip3 index versions to get list of available PyPI versions."""
-    cmd = ["pip3", "index", "versions", package_name]
-    output = subprocess.check_output(cmd, text=True, stderr=subprocess.DEVNULL)
-    versions = []
-    for line in output.strip().splitlines():
-        line = line.strip()
-        if line.startswith('Available versions:'):
-            line = line.replace('Available versions:', '').strip()
-            versions = [v.strip() for v in line.split(',')]
-    # Sort from oldest to newest explicitly (lowest first)
-    try:
-        versions = sorted(versions, key=Version)
-    except InvalidVersion:
-        pass
-    return versions
-
-def find_lowest_valid_version(package_name, version_specifier):
-    """Given the version specifier, find the lowest PyPI available version explicitly meeting the specifier."""
-    versions = get_available_versions(package_name)
-    spec_set = SpecifierSet(version_specifier)
-
-    for ver in versions:
-        try:
-            if Version(ver) in spec_set:
-                return ver
-        except InvalidVersion:
-            continue
+    """Get list of available PyPI versions from the PyPI JSON API."""
+    return get_release_versions(package_name)
+
+def find_lowest_valid_version(package_name, spec_set):
+    """Given the parsed SpecifierSet, find the lowest PyPI available version explicitly meeting it."""
+    for parsed_version, ver in get_parsed_release_versions(package_name):
+        if parsed_version in spec_set:
+            return ver
     # No matching version found explicitly
     return None
 
@@ -56,6 +37,7 @@ def main(package_name):
         sys.exit(1)
 
     dependency_issues = []
+    outdated = []
 
     dependencies = package_info.get("dependencies", [])
     for dep in dependencies:
@@ -75,18 +57,27 @@ def main(package_name):
         # Explicit check of dependency requirements
         try:
             #print(f"Dependency : {dep_name} Installed Version: {installed_version} required_version_spec: {required_version_spec}")
-            if Version(installed_version) not in SpecifierSet(required_version_spec):
-                # Explicitly find lowest valid PyPI version as per your request
-                fixed_version = find_lowest_valid_version(dep_name, required_version_spec)
-                if fixed_version:
-                    dependency_issues.append(f"{dep_name}=={fixed_version}")
-                else:
-                    #print(f"No suitable version found for {dep_name} matching '{required_version_spec}'.")
+            spec_set = _spec(required_version_spec)
+            if _ver(installed_version) not in spec_set:
+                outdated.append((dep_name, spec_set))
         except Exception as e:
             #print(f"Error checking version for {dep_name}: {e}")
+            pass
+
+    # Fetch the version lists of all outdated dependencies at once instead of one by one
+    prefetch_versions((dep_name for dep_name, _ in outdated), max_workers=8)
+
+    for dep_name, spec_set in outdated:
+        # Explicitly find lowest valid PyPI version as per your request
+        fixed_version = find_lowest_valid_version(dep_name, spec_set)
+        if fixed_version:
+            dependency_issues.append(f"{dep_name}=={fixed_version}")
+        else:
+            #print(f"No suitable version found for {dep_name} matching '{spec_set}'.")
+            pass
 
     #print("\nDependency issue packages (fixed to lowest satisfying versions):")
-    print(dependency_issues)
+    print(json.dumps(dependency_issues))
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
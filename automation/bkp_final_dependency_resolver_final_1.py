@@ -1,9 +1,9 @@
-import subprocess
 import sys
 import json
 import logging
-from packaging.version import Version, InvalidVersion
-from packaging.specifiers import SpecifierSet
+from pypi_versions import get_release_versions, get_parsed_release_versions
+from installed_packages import dependency_tree
+from _vercache import V as _ver, S as _spec
 
 logging.basicConfig(
     filename='resolve_dependencies.log',
@@ -13,13 +13,7 @@ logging.basicConfig(
 )
 
 def run_pipdeptree(package_name):
-    cmd = f'pipdeptree -p "{package_name}" --json 2>/dev/null'
-    try:
-        output = subprocess.check_output(cmd, shell=True, text=True)
-        return json.loads(output)
-    except subprocess.CalledProcessError as e:
-        logging.error(f"pipdeptree failed for package '{package_name}': {e}")
-        return []
+    return dependency_tree(package_name)
 
 def get_package_info(data, package_name):
     for package_entry in data:
@@ -29,31 +23,12 @@ def get_package_info(data, package_name):
     return None
 
 def get_available_versions(package_name):
-    try:
-        output = subprocess.check_output(["pip3", "index", "versions", package_name],
-                                         text=True, stderr=subprocess.DEVNULL)
-        versions = []
-        for line in output.strip().splitlines():
-            line = line.strip()
-            if line.startswith('Available versions:'):
-                line = line.replace('Available versions:', '').strip()
-                versions = [v.strip() for v in line.split(',')]
-        sorted_versions = sorted(versions, key=lambda v: Version(v))
-        return sorted_versions
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error fetching versions for package '{package_name}': {e}")
-        return []
-
-def find_lowest_valid_version(package_name, version_specifier):
-    versions = get_available_versions(package_name)
-    specifier_set = SpecifierSet(version_specifier)
-
-    for ver in versions:
-        try:
-            if Version(ver) in specifier_set:
-                return ver
-        except InvalidVersion:
-            continue
+    return get_release_versions(package_name)
+
+def find_lowest_valid_version(package_name, specifier_set):
+    for parsed_version, ver in get_parsed_release_versions(package_name):
+        if parsed_version in specifier_set:
+            return ver
     return None
 
 def main(package_name):
@@ -83,8 +58,9 @@ def main(package_name):
             continue
 
         try:
-            if Version(installed_version) not in SpecifierSet(required_version_spec):
-                fixed_version = find_lowest_valid_version(dep_name, required_version_spec)
+            specifier_set = _spec(required_version_spec)
+            if _ver(installed_version) not in specifier_set:
+                fixed_version = find_lowest_valid_version(dep_name, specifier_set)
                 if fixed_version:
                     dependency_issues.append(f"{dep_name}=={fixed_version}")
                     logging.info(f"Dependency issue: {dep_name} installed {installed_version} does not meet specifier {required_version_spec}. Fixed as {fixed_version}.")
@@ -1,17 +1,15 @@
-import subprocess
 import sys
+import importlib.metadata
+import json
 from packaging.requirements import Requirement
-from packaging.version import Version
+from installed_packages import get_reverse_dependencies
+from _vercache import V as _ver
  
 def get_installed_package_version(package_name):
     """Get installed version of the specified package."""
     try:
-        output = subprocess.check_output(["pip3", "show", package_name], text=True)
-        for line in output.strip().splitlines():
-            if line.startswith("Version:"):
-                return line.split(":")[1].strip()
-        return None
-    except subprocess.CalledProcessError:
+        return importlib.metadata.version(package_name)
+    except importlib.metadata.PackageNotFoundError:
         return None
 
 def requirement_is_satisfied(requirement_str, current_version):
@@ -21,7 +19,7 @@ def requirement_is_satisfied(requirement_str, current_version):
     except Exception as e:
         print(f"Warning: error parsing requirement '{requirement_str}': {e}")
         return None
-    installed_version = Version(current_version)
+    installed_version = _ver(current_version)
     return installed_version in req.specifier
 
 def main(package_name):
@@ -30,27 +28,16 @@ def main(package_name):
         print(f"Error: Package '{package_name}' not found.")
         sys.exit(1)
 
-    cmd = (
-        f'pipdeptree -p "{package_name}" --reverse 2>/dev/null '
-        f'| grep -iE "\\[requires: {package_name}" '
-        f'| awk \'{{print $2";"$4}}\' | tr -d \'[]\' | sort -u'
-    )
-
-    result = subprocess.check_output(cmd, shell=True, text=True)
-
     # A list to store packages whose requirements are NOT satisfied by current version
     problem_packages_detailed = []
     problem_packages_names_only = []
 
-    for line in result.strip().split("\n"):
-        if not line:
-            continue
-        dependent_package, required_spec = line.split(";", 1)
-
-        if required_spec.strip() == package_name:
+    for dependent_name, dependent_version, specifier in get_reverse_dependencies(package_name):
+        # No version constraint, so always satisfied
+        if not specifier:
             continue
 
-        requirement_str = f"{package_name}{required_spec}"
+        requirement_str = f"{package_name}{specifier}"
 
         satisfied = requirement_is_satisfied(requirement_str, current_version)
 
@@ -60,10 +47,8 @@ def main(package_name):
 
         # Append explicitly only if requirement truly unsatisfied (False)
         if not satisfied:
-            problem_packages_detailed.append(line)
-            # Extract package name only without the version info.
-            pkg_name_only = dependent_package.split("==")[0].strip()
-            problem_packages_names_only.append(pkg_name_only)
+            problem_packages_detailed.append(f"{dependent_name}=={dependent_version};{requirement_str}")
+            problem_packages_names_only.append(dependent_name)
 
     # print the problematic packages clearly
     # print("Packages with unsatisfied dependency requirements:")
@@ -74,7 +59,7 @@ def main(package_name):
     #     print("None (All dependencies satisfied!)")
 
     #print("\nProblematic package names only (list):")
-    print(problem_packages_names_only)
+    print(json.dumps(problem_packages_names_only))
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
@@ -1,17 +1,14 @@
 import subprocess
 import sys
+import importlib.metadata
 from packaging.requirements import Requirement
 from packaging.version import Version
 
 def get_installed_package_version(package_name):
     """Get installed version of the specified package."""
     try:
-        output = subprocess.check_output(["pip3", "show", package_name], text=True)
-        for line in output.strip().splitlines():
-            if line.startswith("Version:"):
-                return line.split(":")[1].strip()
-        return None
-    except subprocess.CalledProcessError:
+        return importlib.metadata.version(package_name)
+    except importlib.metadata.PackageNotFoundError:
         return None
 
 def requirement_is_satisfied(requirement_str, current_version):
@@ -0,0 +1,42 @@
+import logging
+
+LOG_BUFFER_SIZE = 64 * 1024
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    Append log records to a file through a large write buffer.
+
+    Args:
+        filename (str): Path of the log file
+        mode (str): Mode the file is opened with
+        encoding (str, optional): Text encoding of the log file
+        buffer_size (int): Size of the write buffer in bytes
+
+    Note:
+        - The file is only opened when the first record is emitted
+        - Records below WARNING stay in the buffer, so a run issues one write()
+          per buffer_size bytes instead of one per record; WARNING and above
+          are flushed immediately so problems show up in the file right away
+        - logging.shutdown(), which runs at interpreter exit, flushes and
+          closes the handler, so nothing buffered is lost on a normal exit
+    """
+    def __init__(self, filename, mode='a', encoding=None, buffer_size=LOG_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        super().__init__(filename, mode=mode, encoding=encoding, delay=True)
+
+    def _open(self):
+        # FileHandler only has an errors attribute from Python 3.9
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=getattr(self, 'errors', None))
+
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.WARNING:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
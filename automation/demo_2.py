@@ -1,12 +1,14 @@
 import subprocess
 import sys
+import importlib.metadata
 import json
 import logging
 import traceback
 from packaging.version import Version, InvalidVersion
+from buffered_logging import BufferedFileHandler
 
 logging.basicConfig(
-    filename='resolve_dependencies.log',
+    handlers=[BufferedFileHandler('resolve_dependencies.log')],
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S'
@@ -22,30 +24,48 @@ def run_command(cmd):
 
 def get_installed_version(package_name):
     try:
-        output = subprocess.check_output(["pip3", "show", package_name], text=True)
-        for line in output.splitlines():
-            if line.startswith("Version:"):
-                return line.split(":", 1)[1].strip()
-    except subprocess.CalledProcessError:
+        return importlib.metadata.version(package_name)
+    except importlib.metadata.PackageNotFoundError:
         return None
 
+# Long-lived resolver helpers started with --serve, keyed by script name
+resolver_helpers = {}
+
+def query_resolver(script, package):
+    proc = resolver_helpers.get(script)
+    if proc is None or proc.poll() is not None:
+        proc = subprocess.Popen(
+            ["python3", script, "--serve"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        resolver_helpers[script] = proc
+    proc.stdin.write(f"{package}\n")
+    proc.stdin.flush()
+    line = proc.stdout.readline()
+    if not line:
+        raise OSError(f"{script} helper exited unexpectedly")
+    return json.loads(line)
+
+def stop_resolvers():
+    for proc in resolver_helpers.values():
+        proc.stdin.close()
+        proc.wait()
+    resolver_helpers.clear()
+
 def parse_dependency_issues(package):
-    cmd = f'python3 dependency_resolver_final.py "{package}"'
     try:
-        output = subprocess.check_output(cmd, shell=True, text=True)
-        issues_list = eval(output.strip().splitlines()[-1])
-        return issues_as_list(issues=issues_fix(issues_list=dependency_issues))
-    except subprocess.CalledProcessError as e:
+        return query_resolver("dependency_resolver_final.py", package)
+    except OSError as e:
         logging.error(f"Error parsing dependency issues for {package}: {e}")
         return []
+    except json.JSONDecodeError as e:
+        logging.error(f"JSON parsing error for dependency issues of {package}: {e}")
+        return []
 
 def parse_reverse_dependencies(package):
-    cmd = f'python3 rev_dependency_resolver_final.py "{package}"'
     try:
-        output = subprocess.check_output(cmd, shell=True, text=True).strip()
-        deps = json.loads(output.replace("'", "\""))  # convert explicitly single quotes to double quotes
-        return deps
-    except subprocess.CalledProcessError as e:
+        return query_resolver("rev_dependency_resolver_final.py", package)
+    except OSError as e:
         logging.error(f"Error in rev_dependency_resolver_final.py for {package}: {e}")
         return []
     except json.JSONDecodeError as e:
@@ -53,9 +73,9 @@ def parse_reverse_dependencies(package):
         return []
 
 def get_trail_version(package, current_version):
-    cmd = f'python3 get_version_for_rev_dependendencies.py "{package}" "{current_version}" --trail'
+    cmd = ["python3", "get_version_for_rev_dependendencies.py", package, current_version, "--trail"]
     try:
-        trail_version = subprocess.check_output(cmd, shell=True, text=True).strip()
+        trail_version = subprocess.check_output(cmd, text=True, stderr=subprocess.DEVNULL).strip()
         return trail_version
     except subprocess.CalledProcessError as e:
         logging.error(f"Error getting trail version for {package}: {e}")
@@ -121,7 +141,7 @@ def main(package_list):
                 previous_version = current_installed_version
             # proceed with explicit upgrade
             try:
-                subprocess.check_call(f'pip3 install "{pkg}"',shell=True)
+                subprocess.check_call(["pip3", "install", pkg])
                 logging.info(f"Installed package: {pkg}")
                 pkg_name_only = pkg.split('==')[0]
                 pkg_version = pkg.split('==')[1]
@@ -138,6 +158,8 @@ def main(package_list):
 
     logging.info("--- Dependency resolution loop completed ---")
 
+    stop_resolvers()
+
     # Explicitly print and log the upgrade summary
     print("\nSummary of package upgrades:")
     for pkg, detail in upgrade_detail.items():
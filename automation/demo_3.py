@@ -1,64 +1,182 @@
 import subprocess
 import sys
+import os
 import json
+import time
+import shutil
+import hashlib
 import logging
+import threading
+import functools
+import importlib.metadata
+from concurrent.futures import ThreadPoolExecutor
 from packaging.version import Version, InvalidVersion
+from packaging.requirements import Requirement, InvalidRequirement
+from packaging.utils import canonicalize_name
+from pypi_versions import prefetch_versions, CACHE_TTL
+from get_normal_max_versions import load_requirement_files
+from installed_packages import installed_distributions, invalidate_cache
+from dependency_resolver_final import main as resolve_dependency_issues
+from rev_dependency_resolver_final import main as resolve_reverse_dependencies
+from get_version_for_rev_dependendencies import main as find_target_versions
+from buffered_logging import BufferedFileHandler
 
-# Logging configuration
-logging.basicConfig(
-    filename='resolve_dependencies.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+# Bound the number of concurrent PyPI-facing lookups to stay polite to the index
+PYPI_SLOTS = threading.Semaphore(8)
+
+# Resolver answers are stored per environment state, so any install invalidates them
+RESOLVER_CACHE_DIR = '.resolver_cache'
+# The answers also depend on the requirement files listed here, which are part of that state
+RESOLVER_CONFIG_FILE = 'files_config.yml'
+# ...and on PyPI's release lists, so entries expire together with the PyPI version cache
+RESOLVER_CACHE_TTL = CACHE_TTL
 
 def run_command(cmd):
     try:
-        output = subprocess.check_output(cmd, shell=True, text=True)
-        logging.debug(f"Command succeeded '{cmd}': Output: {output.strip()}")
+        output = subprocess.check_output(cmd, text=True)
+        logging.debug(f"Command succeeded '{' '.join(cmd)}': Output: {output.strip()}")
         return output.strip()
     except subprocess.CalledProcessError as e:
-        logging.error(f"Command failed '{cmd}': {e.output}")
+        logging.error(f"Command failed '{' '.join(cmd)}': {e.output}")
         return None
 
-def get_installed_version(package_name):
+def get_direct_dependency_names(package):
     try:
-        output = subprocess.check_output(["pip3", "show", package_name], text=True)
-        for line in output.strip().splitlines():
-            if line.startswith("Version:"):
-                return line.split(":", 1)[1].strip()
-        return None
-    except subprocess.CalledProcessError:
-        return None
-
-def parse_dependency_issues(package):
-    cmd = f'python3 dependency_resolver_final.py "{package}"'
-    output = run_command(cmd)
-    if output:
+        requires = importlib.metadata.requires(package) or []
+    except importlib.metadata.PackageNotFoundError:
+        return set()
+    names = set()
+    for requirement_str in requires:
         try:
-            issues_list = json.loads(output.strip().replace("'", '"'))
-            return issues_list if isinstance(issues_list, list) else []
-        except json.JSONDecodeError as e:
-            logging.error(f"JSON parsing error parsing dependency issues for package {package}: {e}")
-    return []
-
-def parse_reverse_dependencies(package):
-    cmd = f'python3 rev_dependency_resolver_final.py "{package}"'
-    output = run_command(cmd)
-    if output:
+            req = Requirement(requirement_str)
+        except InvalidRequirement:
+            continue
+        if req.marker is None or req.marker.evaluate({"extra": ""}):
+            names.add(req.name)
+    return names
+
+def prefetch_candidate_versions(package_list, known_rev_deps, prefetched):
+    candidates = set(package_list) | set(known_rev_deps)
+    for package in package_list:
+        candidates |= get_direct_dependency_names(package)
+    pending = candidates - prefetched
+    if pending:
+        logging.info(f"Prefetching PyPI versions for {len(pending)} packages")
+        prefetch_versions(pending)
+        prefetched |= pending
+
+def worker_count(task_count):
+    return max(1, min(task_count, (os.cpu_count() or 1) * 4))
+
+def requirement_file_stamps():
+    """(path, mtime_ns, size) of the config file and every requirement file it lists."""
+    stamps = []
+    for path in [RESOLVER_CONFIG_FILE, *(load_requirement_files(RESOLVER_CONFIG_FILE) or [])]:
         try:
-            rev_deps_list = json.loads(output.strip().replace("'", '"'))
-            return rev_deps_list if isinstance(rev_deps_list, list) else []
-        except json.JSONDecodeError as e:
-            logging.error(f"JSON parsing error parsing reverse dependencies for package {package}: {e}")
-    return []
+            st = os.stat(path)
+            stamps.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            stamps.append(f"{path}:missing")
+    return stamps
+
+def environment_hash(installed_versions):
+    """Hash the installed versions and the requirement file stamps the resolvers read."""
+    listing = [f"{name}={version}" for name, version in sorted(installed_versions.items())]
+    listing.extend(requirement_file_stamps())
+    return hashlib.blake2b("\n".join(listing).encode()).hexdigest()
+
+def prune_resolver_cache(env_hash):
+    """Delete the cache directories of superseded environment states."""
+    try:
+        names = os.listdir(RESOLVER_CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        if name != env_hash:
+            shutil.rmtree(os.path.join(RESOLVER_CACHE_DIR, name), ignore_errors=True)
+
+def resolver_cache_path(env_hash, kind, package):
+    return os.path.join(RESOLVER_CACHE_DIR, env_hash, kind, f"{canonicalize_name(package)}.json")
+
+def read_resolver_cache(env_hash, kind, package):
+    try:
+        with open(resolver_cache_path(env_hash, kind, package), 'r') as fp:
+            entry = json.load(fp)
+        if time.time() - entry["written"] > RESOLVER_CACHE_TTL:
+            return None
+        return entry["result"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def write_resolver_cache(env_hash, kind, package, result):
+    path = resolver_cache_path(env_hash, kind, package)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'w') as fp:
+            json.dump({"written": time.time(), "result": result}, fp)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not write resolver cache for {package}: {e}")
+
+def parse_dependency_issues(package, env_hash=None):
+    if env_hash:
+        cached = read_resolver_cache(env_hash, 'deps', package)
+        if cached is not None:
+            logging.info(f"Using cached dependency issues for package {package}")
+            return cached
+    try:
+        with PYPI_SLOTS:
+            issues_list = resolve_dependency_issues(package)
+    except Exception as e:
+        logging.error(f"Error resolving dependency issues for package {package}: {e}")
+        return []
+    if issues_list is None:
+        return []
+    if env_hash:
+        write_resolver_cache(env_hash, 'deps', package, issues_list)
+    return issues_list
+
+def parse_reverse_dependencies(package, env_hash=None):
+    if env_hash:
+        cached = read_resolver_cache(env_hash, 'revdeps', package)
+        if cached is not None:
+            logging.info(f"Using cached reverse dependencies for package {package}")
+            return cached
+    try:
+        with PYPI_SLOTS:
+            rev_deps_list = resolve_reverse_dependencies(package)
+    except Exception as e:
+        logging.error(f"Error resolving reverse dependencies for package {package}: {e}")
+        return []
+    if rev_deps_list is None:
+        return []
+    if env_hash:
+        write_resolver_cache(env_hash, 'revdeps', package, rev_deps_list)
+    return rev_deps_list
 
 def get_trail_version(package, current_version):
-    cmd = f'python3 get_version_for_rev_dependendencies.py "{package}" "{current_version}" --trail'
-    return run_command(cmd)
+    try:
+        with PYPI_SLOTS:
+            selected_versions = find_target_versions(package, current_version, ['--trail'])
+    except Exception as e:
+        logging.error(f"Error finding trail version for package {package}: {e}")
+        return None
+    return (selected_versions or {}).get('trail')
+
+def get_rev_dep_trail_spec(rev_dep, installed_versions):
+    current_version = installed_versions.get(canonicalize_name(rev_dep))
+    if not current_version:
+        logging.warning(f"Reverse dependency {rev_dep} not installed; skipping.")
+        return None
+    trail_version = get_trail_version(rev_dep, current_version)
+    if not trail_version:
+        logging.warning(f"Could not determine trail version for {rev_dep}; skipping.")
+        return None
+    return f"{rev_dep}=={trail_version}"
 
 def install_package(package_spec):
-    cmd = f'pip3 install "{package_spec}" --no-deps'
+    cmd = ["pip3", "install", package_spec, "--no-deps"]
     if run_command(cmd) is not None:
         logging.info(f"Installed: {package_spec}")
         return True
@@ -66,6 +184,22 @@ def install_package(package_spec):
         logging.error(f"Installation failed for: {package_spec}")
         return False
 
+def install_packages(install_specs):
+    """Install all specs in one pip run; fall back to one run per spec if the batch fails."""
+    if not install_specs:
+        return []
+    specs = list(install_specs.values())
+    try:
+        subprocess.check_call(["pip3", "install", "--no-deps", *specs])
+        logging.info(f"Installed: {specs}")
+        return list(install_specs)
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Batch installation failed ({e}); retrying packages one by one.")
+    return [pkg_name for pkg_name, pkg_spec in install_specs.items() if install_package(pkg_spec)]
+
+def snapshot_installed_versions():
+    return {key: dist.version for key, dist in installed_distributions().items()}
+
 def main(package_list):
     upgrade_history = {}
     iteration = 0
@@ -73,31 +207,37 @@ def main(package_list):
 
     logging.info("=== Starting dependency resolution loop ===")
 
+    prefetched = set()
+    rev_deps = set()
+
     while iteration < MAX_ITERATIONS:
         logging.info(f"--- Iteration {iteration + 1} ---")
+        prefetch_candidate_versions(package_list, rev_deps, prefetched)
+        installed_versions = snapshot_installed_versions()
+        env_hash = environment_hash(installed_versions)
+        prune_resolver_cache(env_hash)
         dependency_issue_packages = set()
         rev_deps_trail_packages = set()
 
         # Step 1: Resolve direct dependency issues
-        for package in package_list:
-            logging.info(f"Analyzing direct dependencies for {package}")
-            issues = parse_dependency_issues(package)
-            dependency_issue_packages.update(issues)
+        logging.info(f"Analyzing direct dependencies for {package_list}")
+        with ThreadPoolExecutor(max_workers=worker_count(len(package_list))) as executor:
+            dependency_lookup = functools.partial(parse_dependency_issues, env_hash=env_hash)
+            for issues in executor.map(dependency_lookup, package_list):
+                dependency_issue_packages.update(issues)
 
         # Step 2: Resolve reverse dependency issues
-        for package in package_list:
-            logging.info(f"Analyzing reverse dependencies for {package}")
-            rev_deps = parse_reverse_dependencies(package)
-            for rev_dep in rev_deps:
-                current_version = get_installed_version(rev_dep)
-                if not current_version:
-                    logging.warning(f"Reverse dependency {rev_dep} not installed; skipping.")
-                    continue
-                trail_version = get_trail_version(rev_dep, current_version)
-                if trail_version:
-                    rev_deps_trail_packages.add(f"{rev_dep}=={trail_version}")
-                else:
-                    logging.warning(f"Could not determine trail version for {rev_dep}; skipping.")
+        logging.info(f"Analyzing reverse dependencies for {package_list}")
+        rev_deps = set()
+        with ThreadPoolExecutor(max_workers=worker_count(len(package_list))) as executor:
+            reverse_lookup = functools.partial(parse_reverse_dependencies, env_hash=env_hash)
+            for deps in executor.map(reverse_lookup, package_list):
+                rev_deps.update(deps)
+        with ThreadPoolExecutor(max_workers=worker_count(len(rev_deps))) as executor:
+            trail_lookup = functools.partial(get_rev_dep_trail_spec, installed_versions=installed_versions)
+            for trail_spec in executor.map(trail_lookup, rev_deps):
+                if trail_spec:
+                    rev_deps_trail_packages.add(trail_spec)
 
         # Merge both sets of packages to install
         combined_install_list = set(dependency_issue_packages) | rev_deps_trail_packages
@@ -107,27 +247,31 @@ def main(package_list):
 
         logging.info(f"Packages to upgrade in iteration {iteration + 1}: {combined_install_list}")
 
-        # Step 3: Install packages explicitly without dependencies
+        # Step 3: Install packages explicitly without dependencies, in a single pip run
+        install_specs = {}
         for pkg_spec in combined_install_list:
             if "==" in pkg_spec:
                 pkg_name, pkg_version = pkg_spec.split("==")
             else:
                 pkg_name = pkg_spec
-                current_version = get_installed_version(pkg_name) or '0.0.0'
+                current_version = installed_versions.get(canonicalize_name(pkg_name)) or '0.0.0'
                 pkg_version = get_trail_version(pkg_name, current_version)
                 if not pkg_version:
                     logging.warning(f"Skipping {pkg_name}: cannot determine required version.")
                     continue
                 pkg_spec = f"{pkg_name}=={pkg_version}"
+            install_specs[pkg_name] = pkg_spec
 
-            previous_version = get_installed_version(pkg_name) or "Not Installed"
+        installed_names = install_packages(install_specs)
+        invalidate_cache()
+        new_versions = snapshot_installed_versions()
 
-            if install_package(pkg_spec):
-                new_version = get_installed_version(pkg_name) or "Installation failed"
-                upgrade_history[pkg_name] = {
-                    "previous_version": previous_version,
-                    "upgraded_version": new_version
-                }
+        for pkg_name in installed_names:
+            key = canonicalize_name(pkg_name)
+            upgrade_history[pkg_name] = {
+                "previous_version": installed_versions.get(key, "Not Installed"),
+                "upgraded_version": new_versions.get(key, "Installation failed")
+            }
 
         iteration += 1
 
@@ -139,6 +283,13 @@ def main(package_list):
         logging.info(f"{pkg}: {versions['previous_version']} → {versions['upgraded_version']}")
 
 if __name__ == "__main__":
+    # Logging configuration
+    logging.basicConfig(
+        handlers=[BufferedFileHandler('resolve_dependencies.log')],
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
     if len(sys.argv) != 2:
         print(f"\nUsage: python3 {sys.argv[0]} '<package1>,<package2>,...'\n")
         sys.exit(1)
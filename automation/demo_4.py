@@ -1,23 +1,20 @@
 import yaml
 import sys
 from packaging.version import Version
+from get_normal_max_versions import REQUIREMENT_PIN
 
 def load_config(config_file):
     with open(config_file, 'r') as stream:
         return yaml.safe_load(stream)
 
 def read_requirements(file_path):
-    packages = {}
     try:
-        with open(file_path, 'r') as fp:
-            for line in fp:
-                line = line.strip()
-                if '==' in line:
-                    pkg, ver = line.split('==')
-                    packages[pkg.strip()] = ver.strip()
+        with open(file_path, 'rb') as fp:
+            buf = fp.read()
     except FileNotFoundError:
-        pass
-    return packages
+        return {}
+    # One C-level scan over the raw bytes; only the matched names and versions are decoded
+    return {m.group(1).decode(): m.group(2).decode() for m in REQUIREMENT_PIN.finditer(buf)}
 
 def write_requirements(file_path, package_versions):
     with open(file_path, 'w') as fp:
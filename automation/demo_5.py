@@ -1,48 +1,61 @@
+import os
 import yaml
 import sys
-from packaging.version import Version
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from _vercache import V as _ver
+from get_normal_max_versions import REQUIREMENT_PIN
+
+_requirements_cache = {}
 
 def load_config(config_file):
     with open(config_file, 'r') as stream:
         return yaml.safe_load(stream)
 
 def read_requirements(file_path):
-    packages = {}
     try:
-        with open(file_path, 'r') as fp:
-            for line in fp:
-                line = line.strip()
-                if '==' in line:
-                    pkg, ver = line.split('==')
-                    packages[pkg.strip()] = ver.strip()
+        st = os.stat(file_path)
     except FileNotFoundError:
-        pass
-    return packages
+        return {}
+    # Size is part of the key so a rewrite within the mtime granularity is still seen
+    key = (file_path, st.st_mtime_ns, st.st_size)
+    packages = _requirements_cache.get(key)
+    if packages is None:
+        try:
+            buf = Path(file_path).read_bytes()
+        except FileNotFoundError:
+            return {}
+        packages = {m.group(1).decode(): m.group(2).decode() for m in REQUIREMENT_PIN.finditer(buf)}
+        _requirements_cache[key] = packages
+    # Callers update the returned dict in place, so never hand out the cached one
+    return dict(packages)
 
 def write_requirements(file_path, package_versions):
-    with open(file_path, 'w') as fp:
-        for pkg, ver in package_versions.items():
-            fp.write(f"{pkg}=={ver}\n")
+    content = "".join(f"{pkg}=={ver}\n" for pkg, ver in package_versions.items())
+    # Write beside the target and swap it in, so concurrent readers never see a partial file
+    tmp_path = f"{file_path}.tmp"
+    Path(tmp_path).write_text(content)
+    os.replace(tmp_path, file_path)
 
 def get_package_version(file, package_name):
     packages = read_requirements(file)
     return packages.get(package_name)
 
 def get_max_version_across_files(files, package_name):
-    max_version = None
-    file_with_max_version = None
-    for file in files:
-        packages = read_requirements(file)
+    # Overlap the file reads; map() keeps file order so ties still go to the first file
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        contents = list(executor.map(read_requirements, files))
+
+    candidates = []
+    for file, packages in zip(files, contents):
         ver = packages.get(package_name)
         if ver:
             try:
-                current_version = Version(ver)
-                if (max_version is None) or (current_version > Version(max_version)):
-                    max_version = ver
-                    file_with_max_version = file
+                candidates.append((_ver(ver), ver, file))
             except:
                 continue
-    if max_version:
+    if candidates:
+        _, max_version, file_with_max_version = max(candidates, key=lambda entry: entry[0])
         return [max_version, file_with_max_version]
     else:
         return [None, None]
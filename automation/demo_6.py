@@ -1,68 +1,104 @@
+import os
 import yaml
 import sys
+import pickle
 import logging
-from packaging.version import Version
+from _vercache import V
+from get_normal_max_versions import REQUIREMENT_PIN
+from buffered_logging import BufferedFileHandler
 
-# Set up explicit logging:
-logging.basicConfig(
-    filename='resolve_dependencies.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+log = logging.getLogger(__name__)
+
+# libyaml's C parser when PyYAML was built with it, the pure-Python one otherwise
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 def load_config(config_file):
+    # A pickle next to the config holds the last parse, tagged with the source's mtime and size
+    st = os.stat(config_file)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cache_file = f"{config_file}.pkl"
+    try:
+        with open(cache_file, 'rb') as fp:
+            cached_stamp, config = pickle.load(fp)
+        if cached_stamp == stamp:
+            return config
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        pass
+
     with open(config_file, 'r') as stream:
-        logging.info(f"Loading config file: {config_file}")
-        return yaml.safe_load(stream)
+        log.info("Loading config file: %s", config_file)
+        config = yaml.load(stream, Loader=SafeLoader)
+
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, 'wb') as fp:
+            pickle.dump((stamp, config), fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        log.warning("Could not cache parsed config %s: %s", config_file, e)
+    return config
+
+# path -> (mtime_ns, size, parsed packages); an entry is reused while the file is unchanged
+_requirements_cache = {}
 
 def read_requirements(file_path):
-    packages = {}
     try:
-        with open(file_path, 'r') as fp:
-            logging.info(f"Reading requirements from: {file_path}")
-            for line in fp:
-                line = line.strip()
-                if '==' in line:
-                    pkg, ver = line.split('==')
-                    packages[pkg.strip()] = ver.strip()
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        log.error("File not found: %s", file_path)
+        return {}
+    cached = _requirements_cache.get(file_path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return dict(cached[2])
+    try:
+        with open(file_path, 'rb') as fp:
+            log.info("Reading requirements from: %s", file_path)
+            data = fp.read()
     except FileNotFoundError:
-        logging.error(f"File not found: {file_path}")
-    return packages
+        log.error("File not found: %s", file_path)
+        return {}
+    # Scanned as bytes, so lines without a pin are never decoded
+    packages = {pkg.decode(): ver.decode() for pkg, ver in REQUIREMENT_PIN.findall(data)}
+    _requirements_cache[file_path] = (st.st_mtime_ns, st.st_size, packages)
+    # Callers update the returned dict in place, so never hand out the cached one
+    return dict(packages)
 
 def write_requirements(file_path, package_versions):
     with open(file_path, 'w') as fp:
-        logging.info(f"Writing updated requirements to: {file_path}")
-        for pkg, ver in package_versions.items():
-            fp.write(f"{pkg}=={ver}\n")
+        log.info("Writing updated requirements to: %s", file_path)
+        fp.write("".join(f"{pkg}=={ver}\n" for pkg, ver in package_versions.items()))
+    _requirements_cache.pop(file_path, None)
 
 def get_package_version(file, package_name):
     packages = read_requirements(file)
     version = packages.get(package_name)
     if version:
-        logging.info(f"{package_name} version in {file}: {version}")
+        log.info("%s version in %s: %s", package_name, file, version)
     else:
-        logging.warning(f"{package_name} not found in {file}")
+        log.warning("%s not found in %s", package_name, file)
     return version
 
 def get_max_version_across_files(files, package_name):
     max_version = None
+    max_parsed = None
     file_with_max_version = None
     for file in files:
         packages = read_requirements(file)
         ver = packages.get(package_name)
         if ver:
             try:
-                current_version = Version(ver)
-                if (max_version is None) or (current_version > Version(max_version)):
+                current_version = V(ver)
+                if (max_parsed is None) or (current_version > max_parsed):
                     max_version = ver
+                    max_parsed = current_version
                     file_with_max_version = file
             except Exception as e:
-                logging.error(f"Version parsing error for {package_name} in {file}: {e}")
+                log.error("Version parsing error for %s in %s: %s", package_name, file, e)
     if max_version:
-        logging.info(f"Max version of {package_name} across files: {max_version} (found in {file_with_max_version})")
+        log.info("Max version of %s across files: %s (found in %s)", package_name, max_version, file_with_max_version)
         return [max_version, file_with_max_version]
     else:
-        logging.warning(f"{package_name} not found in any files")
+        log.warning("%s not found in any files", package_name)
         return [None, None]
 
 def update_package_version_in_file(file, package_name, new_version):
@@ -70,24 +106,30 @@ def update_package_version_in_file(file, package_name, new_version):
     if package_name in packages:
         packages[package_name] = new_version
         write_requirements(file, packages)
-        logging.info(f"Updated {package_name} to version {new_version} in {file}")
+        log.info("Updated %s to version %s in %s", package_name, new_version, file)
         return True
-    logging.warning(f"No changes: {package_name} not found in {file}")
+    log.warning("No changes: %s not found in %s", package_name, file)
     return False
 
 if __name__ == "__main__":
+    # Set up explicit logging:
+    logging.basicConfig(
+        handlers=[BufferedFileHandler('resolve_dependencies.log')],
+        level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
     config = load_config("files_config.yml")
     files = config['requirement_files']
 
     if len(sys.argv) < 2:
-        logging.error("No action provided. Exiting.")
+        log.error("No action provided. Exiting.")
         sys.exit(1)
 
     action = sys.argv[1]
 
     if action == "get":
         if len(sys.argv) != 4:
-            logging.error("Incorrect usage for 'get' command.")
+            log.error("Incorrect usage for 'get' command.")
             sys.exit(1)
         _, _, package_name, file = sys.argv
         version = get_package_version(file, package_name)
@@ -98,7 +140,7 @@ if __name__ == "__main__":
 
     elif action == "max":
         if len(sys.argv) != 3:
-            logging.error("Incorrect usage for 'max' command.")
+            log.error("Incorrect usage for 'max' command.")
             sys.exit(1)
         _, _, package_name = sys.argv
         result = get_max_version_across_files(files, package_name)
@@ -109,7 +151,7 @@ if __name__ == "__main__":
 
     elif action == "set":
         if len(sys.argv) != 5:
-            logging.error("Incorrect usage for 'set' command.")
+            log.error("Incorrect usage for 'set' command.")
             sys.exit(1)
         _, _, package_name, new_version, file = sys.argv
         successful = update_package_version_in_file(file, package_name, new_version)
@@ -117,5 +159,5 @@ if __name__ == "__main__":
             sys.exit(1)
 
     else:
-        logging.error(f"Invalid action specified: {action}. Allowed actions: get|max|set")
+        log.error("Invalid action specified: %s. Allowed actions: get|max|set", action)
         sys.exit(1)
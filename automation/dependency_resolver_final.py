@@ -1,16 +1,86 @@
+import os
+import bisect
 import subprocess
 import sys
+import functools
 import json
 import logging
-from packaging.version import Version, InvalidVersion
-from packaging.specifiers import SpecifierSet
+import threading
+from packaging.version import InvalidVersion
+from concurrent.futures import ThreadPoolExecutor
+from pypi_versions import get_release_versions, get_release_version_index
+from get_normal_max_versions import get_max_version_across_files, load_requirement_files
+from _vercache import V as _ver, S as _spec
+from buffered_logging import BufferedFileHandler
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-logging.basicConfig(
-    filename='resolve_dependencies.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+log = logging.getLogger(__name__)
+
+# orjson parses and serializes in C; the stdlib json module is the fallback
+if orjson is not None:
+    _json_loads = orjson.loads
+    _json_dumps = lambda obj: orjson.dumps(obj).decode()
+else:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+CONFIG_FILE = "files_config.yml"
+
+# Requirement files listed in CONFIG_FILE, read on first use and kept until
+# invalidate_requirement_files() is called
+_requirement_files = {"files": None}
+
+def requirement_files():
+    """
+    Get the requirement files listed in CONFIG_FILE.
+    
+    Returns:
+        list: Paths of the requirement files ([] if the config cannot be loaded)
+        
+    Note:
+        - CONFIG_FILE is resolved against the working directory at the first
+          call, not at import time
+        - A config that cannot be loaded is not cached, so the next call
+          tries again
+    """
+    files = _requirement_files["files"]
+    if files is None:
+        files = load_requirement_files(CONFIG_FILE)
+        if files is None:
+            return []
+        _requirement_files["files"] = files
+    return files
+
+def invalidate_requirement_files():
+    """
+    Forget the requirement files list so the next lookup reads CONFIG_FILE again.
+    """
+    _requirement_files["files"] = None
+
+# Whole-environment pipdeptree output, reused while site-packages is unchanged
+_PIPDEPTREE_CACHE = {"fingerprint": None, "data": None, "index": None}
+# Concurrent callers wait for one pipdeptree run instead of each starting their own
+_PIPDEPTREE_LOCK = threading.Lock()
+# PyPI lookups of every main() call share one pool, so concurrent callers
+# neither start a pool per call nor multiply the number of open requests
+_LOOKUP_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+# (package name lowercased, specifier) -> lowest matching PyPI version, kept across calls;
+# it depends only on PyPI's release list, not on what is installed, so installs keep it valid
+FIXED_VERSION_CACHE = {}
+
+def _environment_fingerprint():
+    """Modification times of the sys.path directories; installs and removals change them."""
+    fingerprint = []
+    for path in sys.path:
+        try:
+            fingerprint.append(os.stat(path or ".").st_mtime_ns)
+        except OSError:
+            fingerprint.append(None)
+    return tuple(fingerprint)
 
 def run_pipdeptree(package_name):
     """
@@ -26,17 +96,53 @@ def run_pipdeptree(package_name):
         - ERROR: If pipdeptree command fails
         
     Note:
-        - Uses pipdeptree with --json flag
-        - Redirects stderr to /dev/null to suppress warnings
+        - Uses pipdeptree with --json flag over the whole environment, once per
+          process until an install or removal changes a sys.path directory;
+          get_package_info picks the requested package out of the result
+        - Runs pipdeptree directly (no shell) and discards stderr to suppress warnings
         - Returns empty list if command fails
+        - Safe to call from several threads; only one of them runs pipdeptree
     """
-    cmd = f'pipdeptree -p "{package_name}" --json 2>/dev/null'
+    with _PIPDEPTREE_LOCK:
+        return _run_pipdeptree(package_name)
+
+def _run_pipdeptree(package_name):
+    fingerprint = _environment_fingerprint()
+    if _PIPDEPTREE_CACHE["fingerprint"] == fingerprint:
+        return _PIPDEPTREE_CACHE["data"]
+
+    cmd = ["pipdeptree", "--json"]
     try:
-        output = subprocess.check_output(cmd, shell=True, text=True)
-        return json.loads(output)
-    except subprocess.CalledProcessError as e:
-        logging.error(f"pipdeptree failed for package '{package_name}': {e.output}")
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False)
+    except OSError as e:
+        log.error("pipdeptree could not be started for package '%s': %s", package_name, e)
         return []
+    if proc.returncode != 0:
+        log.error("pipdeptree failed for package '%s' with exit code %s", package_name, proc.returncode)
+        return []
+    # Both parsers accept the raw UTF-8 bytes, so no separate decode pass is needed
+    data = _json_loads(proc.stdout)
+
+    _PIPDEPTREE_CACHE["fingerprint"] = fingerprint
+    _PIPDEPTREE_CACHE["data"] = data
+    _PIPDEPTREE_CACHE["index"] = index_pipdeptree(data)
+    return data
+
+def index_pipdeptree(data):
+    """
+    Map lowercased package keys to their pipdeptree entries.
+    
+    Args:
+        data (list): JSON data from pipdeptree
+        
+    Returns:
+        dict: Lowercased package key -> first entry with that key
+    """
+    index = {}
+    for entry in data:
+        pkg_key = entry.get("package", {}).get("key", "").lower()
+        index.setdefault(pkg_key, entry)
+    return index
 
 def get_package_info(data, package_name):
     """
@@ -52,12 +158,14 @@ def get_package_info(data, package_name):
     Note:
         - Case-insensitive package name matching
         - Returns the first matching package entry
+        - Uses the index built alongside the cached pipdeptree output, or
+          indexes other data on the fly
     """
-    for entry in data:
-        pkg_key = entry.get("package", {}).get("key", "").lower()
-        if pkg_key == package_name.lower():
-            return entry
-    return None
+    if data is _PIPDEPTREE_CACHE["data"]:
+        index = _PIPDEPTREE_CACHE["index"]
+    else:
+        index = index_pipdeptree(data)
+    return index.get(package_name.lower())
 
 def get_available_versions(package_name):
     """
@@ -70,33 +178,33 @@ def get_available_versions(package_name):
         list: Sorted list of version strings (ascending order)
         
     Logs:
-        - ERROR: If pip command fails
+        - ERROR: If PyPI cannot be queried
         
     Note:
-        - Uses pip3 index versions command
-        - Parses the output to extract version numbers
-        - Sorts versions using packaging.version.Version
+        - Uses the PyPI JSON API via pypi_versions.get_release_versions
+        - Results are cached in-process and on disk
     """
-    try:
-        output = subprocess.check_output(["pip3", "index", "versions", package_name], text=True, stderr=subprocess.DEVNULL)
-        versions = []
-        for line in output.strip().splitlines():
-            if line.startswith('Available versions:'):
-                versions_line = line.split('Available versions:', 1)[1]
-                versions = [ver.strip() for ver in versions_line.strip().split(",")]
-        sorted_versions = sorted(versions, key=lambda v: Version(v))
-        return sorted_versions
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error getting PyPI versions for {package_name}: {e.output}")
-        return []
+    return get_release_versions(package_name)
 
-def find_lowest_valid_version(package_name, version_specifier):
+@functools.lru_cache(maxsize=8192)
+def _lower_bound(spec_set):
+    """Return the tightest '>=', '>' or '~=' bound of a SpecifierSet as a Version, or None."""
+    bounds = []
+    for spec in spec_set:
+        if spec.operator in (">=", ">", "~="):
+            try:
+                bounds.append(_ver(spec.version))
+            except InvalidVersion:
+                continue
+    return max(bounds) if bounds else None
+
+def find_lowest_valid_version(package_name, spec_set):
     """
     Find the lowest version of a package that satisfies a version specifier.
     
     Args:
         package_name (str): Name of the package
-        version_specifier (str): Version specifier (e.g., ">=1.0.0,<2.0.0")
+        spec_set (SpecifierSet): Parsed version specifier (e.g., _spec(">=1.0.0,<2.0.0"))
         
     Returns:
         str or None: Lowest valid version if found, None otherwise
@@ -106,21 +214,28 @@ def find_lowest_valid_version(package_name, version_specifier):
         - WARNING: When no valid version is found
         
     Note:
-        - Queries PyPI for available versions
-        - Tests each version against the specifier
+        - Queries PyPI for available versions (parsed once and cached)
+        - Tests each version against the specifier, oldest first, starting
+          from the specifier's lower bound (found by bisection) when it has one
         - Returns the first (lowest) version that satisfies the specifier
+        - Answers are memoized in FIXED_VERSION_CACHE; failed PyPI lookups are not
     """
-    versions = get_available_versions(package_name)
-    spec_set = SpecifierSet(version_specifier)
+    cache_key = (package_name.lower(), spec_set)
+    if cache_key in FIXED_VERSION_CACHE:
+        return FIXED_VERSION_CACHE[cache_key]
 
-    for ver in versions:
-        try:
-            if Version(ver) in spec_set:
-                logging.info(f"Lowest PyPI valid version for {package_name} matching '{version_specifier}': {ver}")
-                return ver
-        except InvalidVersion:
-            continue
-    logging.warning(f"No matching valid PyPI version found for {package_name} spec '{version_specifier}'")
+    versions, parsed_only = get_release_version_index(package_name)
+    lower_bound = _lower_bound(spec_set)
+    start = 0 if lower_bound is None else bisect.bisect_left(parsed_only, lower_bound)
+
+    for parsed_version, ver in versions[start:]:
+        if parsed_version in spec_set:
+            log.info("Lowest PyPI valid version for %s matching '%s': %s", package_name, spec_set, ver)
+            FIXED_VERSION_CACHE[cache_key] = ver
+            return ver
+    log.warning("No matching valid PyPI version found for %s spec '%s'", package_name, spec_set)
+    if versions:
+        FIXED_VERSION_CACHE[cache_key] = None
     return None
 
 def get_max_requirement_version(package_name):
@@ -137,17 +252,14 @@ def get_max_requirement_version(package_name):
         - ERROR: If an error occurs during execution
         
     Note:
-        - Uses get_normal_max_versions.py script
+        - Calls get_normal_max_versions.get_max_version_across_files in-process
+          over the requirement files listed in CONFIG_FILE
         - Returns both the version and the file it was found in
     """
     try:
-        result = subprocess.check_output(["python3", "get_normal_max_versions.py", "max", package_name], text=True)
-        result = result.strip()
-        max_version_list = json.loads(result.replace("'", '"'))
-        if max_version_list[0]:
-            return max_version_list[0], max_version_list[1]
+        return get_max_version_across_files(requirement_files(), package_name)
     except Exception as e:
-        logging.error(f"Error getting max version from requirement file for {package_name}: {e}")
+        log.error("Error getting max version from requirement file for %s: %s", package_name, e)
     return None, None
 
 def main(package_name):
@@ -164,10 +276,8 @@ def main(package_name):
         package_name (str): Name of the package to analyze
         
     Returns:
-        None: Results are printed to stdout as JSON
-        
-    Exits:
-        - With code 1 if package info is not found
+        list or None: Package specifications to install (e.g., ["pkg1==1.0.0", "pkg2==2.0.0"]),
+                      or None if package info is not found
         
     Logs:
         - INFO: When starting resolution
@@ -176,21 +286,22 @@ def main(package_name):
         - ERROR: When processing errors occur
         
     Note:
-        - Outputs a JSON array of package specifications (e.g., ["pkg1==1.0.0", "pkg2==2.0.0"])
-        - Empty array means no dependency issues
+        - Empty list means no dependency issues
+        - PyPI lookups run on the module's shared _LOOKUP_EXECUTOR, so calling
+          main from a caller's own thread pool does not nest another pool
     """
-    logging.info(f"[dependency_resolver_final.py] Resolving explicitly dependencies for '{package_name}'")
+    log.info("[dependency_resolver_final.py] Resolving explicitly dependencies for '%s'", package_name)
 
     data = run_pipdeptree(package_name)
     package_info = get_package_info(data, package_name)
 
     if not package_info:
-        logging.error(f"No such package info found for '{package_name}'")
-        print("[]")
-        sys.exit(1)
+        log.error("No such package info found for '%s'", package_name)
+        return None
 
     dependency_issues = []
     dependencies = package_info.get("dependencies", [])
+    outdated = []
 
     for dep in dependencies:
         dep_name = dep.get("package_name")
@@ -198,54 +309,105 @@ def main(package_name):
         required_specifier = dep.get("required_version", "").strip()
 
         if installed_version in ["?", None, ""]:
-            logging.warning(f"Dependency '{dep_name}' has no installed version. Skipping.")
+            log.warning("Dependency '%s' has no installed version. Skipping.", dep_name)
             continue
 
         if required_specifier.lower() in ["any", ""]:
             continue
 
+        # Exact pin on the installed version: satisfied without parsing either string
+        if required_specifier.startswith("==") and required_specifier[2:] == installed_version:
+            continue
+
         try:
-            if Version(installed_version) not in SpecifierSet(required_specifier):
-                py_version = find_lowest_valid_version(dep_name, required_specifier)
-                req_version, req_file = get_max_requirement_version(dep_name)
-
-                chosen_version = py_version
-
-                if py_version and req_version:
-                    if Version(req_version) > Version(py_version):
-                        logging.info(
-                            f"For '{dep_name}', requirement file version '{req_version}' found in '{req_file}' "
-                            f"is higher than lowest PyPI valid '{py_version}'. Using higher '{req_version}' explicitly."
-                        )
-                        chosen_version = req_version
-                    else:
-                        logging.info(
-                            f"For '{dep_name}', using PyPI lowest valid version '{py_version}' explicitly."
-                        )
-                elif req_version and not py_version:
-                    logging.info(
-                        f"For '{dep_name}', no valid PyPI version found; explicitly using "
-                        f"requirement file version '{req_version}' from item '{req_file}'."
+            spec_set = _spec(required_specifier)
+            if _ver(installed_version) not in spec_set:
+                outdated.append((dep_name, installed_version, required_specifier, spec_set))
+        except Exception as ex:
+            log.error("Error explicitly processing dependency '%s': %s", dep_name, ex)
+
+    def lookup_lowest(entry):
+        dep_name, _, _, spec_set = entry
+        try:
+            return find_lowest_valid_version(dep_name, spec_set)
+        except Exception as ex:
+            log.error("Error explicitly processing dependency '%s': %s", dep_name, ex)
+            return None
+
+    # Overlap the PyPI lookups of all outdated dependencies
+    if len(outdated) > 1:
+        py_versions = list(_LOOKUP_EXECUTOR.map(lookup_lowest, outdated))
+    else:
+        py_versions = [lookup_lowest(entry) for entry in outdated]
+
+    for (dep_name, installed_version, required_specifier, _), py_version in zip(outdated, py_versions):
+        try:
+            req_version, req_file = get_max_requirement_version(dep_name)
+
+            chosen_version = py_version
+
+            if py_version and req_version:
+                if _ver(req_version) > _ver(py_version):
+                    log.info(
+                        "For '%s', requirement file version '%s' found in '%s' "
+                        "is higher than lowest PyPI valid '%s'. Using higher '%s' explicitly.",
+                        dep_name, req_version, req_file, py_version, req_version
                     )
                     chosen_version = req_version
-                elif not py_version and not req_version:
-                    logging.warning(
-                        f"No valid PyPI or requirement file version found explicitly for '{dep_name}'."
-                    )
-                    continue
-
-                dep_specifier = f"{dep_name}=={chosen_version}"
-                dependency_issues.append(dep_specifier)
-                logging.info(
-                    f"Dependency updated explicitly: '{dep_name}' installed '{installed_version}' "
-                    f"doesn't satisfy '{required_specifier}'. Using explicitly '{chosen_version}'."
+                else:
+                    log.info("For '%s', using PyPI lowest valid version '%s' explicitly.", dep_name, py_version)
+            elif req_version and not py_version:
+                log.info(
+                    "For '%s', no valid PyPI version found; explicitly using "
+                    "requirement file version '%s' from item '%s'.",
+                    dep_name, req_version, req_file
                 )
+                chosen_version = req_version
+            elif not py_version and not req_version:
+                log.warning("No valid PyPI or requirement file version found explicitly for '%s'.", dep_name)
+                continue
+
+            dep_specifier = f"{dep_name}=={chosen_version}"
+            dependency_issues.append(dep_specifier)
+            log.info(
+                "Dependency updated explicitly: '%s' installed '%s' "
+                "doesn't satisfy '%s'. Using explicitly '%s'.",
+                dep_name, installed_version, required_specifier, chosen_version
+            )
 
         except Exception as ex:
-            logging.error(f"Error explicitly processing dependency '{dep_name}': {ex}")
+            log.error("Error explicitly processing dependency '%s': %s", dep_name, ex)
+
+    log.info("Explicit dependency issues resolved for '%s': %s", package_name, dependency_issues)
+    return dependency_issues
 
-    logging.info(f"Explicit dependency issues resolved for '{package_name}': {dependency_issues}")
-    print(json.dumps(dependency_issues))
+def serve():
+    """
+    Answer dependency resolution requests over stdin/stdout until stdin closes.
+    
+    Reads one package name per line and writes one JSON array per line, so a
+    caller can keep a single helper process alive instead of starting a new
+    interpreter for every package.
+    
+    Logs:
+        - ERROR: If resolving a package raises; an empty array is written instead
+        
+    Note:
+        - Reads CONFIG_FILE again for every request, since the caller may
+          have edited the requirement files it lists in between
+    """
+    for line in sys.stdin:
+        package_name = line.strip()
+        if not package_name:
+            continue
+        invalidate_requirement_files()
+        try:
+            dependency_issues = main(package_name)
+        except Exception as ex:
+            log.exception("Unexpected error explicitly processing '%s': %s", package_name, ex)
+            dependency_issues = None
+        sys.stdout.write(_json_dumps(dependency_issues or []) + "\n")
+        sys.stdout.flush()
 
 if __name__ == "__main__":
     """
@@ -253,30 +415,49 @@ if __name__ == "__main__":
     
     Usage:
         python dependency_resolver_final.py <package_name>
+        python dependency_resolver_final.py --serve
     
     Args:
         package_name: Name of the package to analyze
+        --serve: Read package names from stdin, one per line, until EOF
     
     Outputs:
         - Prints a JSON array of package specifications to stdout
+          (one line per requested package with --serve)
     
     Exits:
         - With code 1 if arguments are missing or invalid
+        - With code 1 if package info is not found
         - With code 1 if an unexpected error occurs
     
     Logs:
         - ERROR: If arguments are missing or invalid
         - ERROR: If an unexpected error occurs
     """
+    logging.basicConfig(
+        handlers=[BufferedFileHandler('resolve_dependencies.log')],
+        level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    if sys.argv[1:] == ["--serve"]:
+        serve()
+        sys.exit(0)
+
     if len(sys.argv) != 2:
-        logging.error("Incorrect usage clearly: python3 dependency_resolver_final.py <package_name> explicitly required.")
+        log.error("Incorrect usage clearly: python3 dependency_resolver_final.py <package_name> explicitly required.")
         print("[]")
         sys.exit(1)
 
     package_name = sys.argv[1].strip()
     try:
-        main(package_name)
+        dependency_issues = main(package_name)
     except Exception as ex:
-        logging.exception(f"Unexpected error explicitly processing '{package_name}': {ex}")
+        log.exception("Unexpected error explicitly processing '%s': %s", package_name, ex)
+        print("[]")
+        sys.exit(1)
+
+    if dependency_issues is None:
         print("[]")
         sys.exit(1)
+    print(_json_dumps(dependency_issues))
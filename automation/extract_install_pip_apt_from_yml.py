@@ -1,19 +1,35 @@
 import yaml
 import subprocess
-from pathlib import Path
 import os
 import sys
 import logging
 import re
 import json
+import time
+import pickle
+import functools
+from packaging.utils import canonicalize_name
+from buffered_logging import BufferedFileHandler
 
-# Configure logging to write to a file with timestamp, level, and message
-logging.basicConfig(
-    filename='resolve_dependencies.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+log = logging.getLogger(__name__)
+
+# apt rewrites this file on every `apt-get update`; a younger cache is not refreshed again
+APT_CACHE_FILE = '/var/cache/apt/pkgcache.bin'
+APT_CACHE_MAX_AGE = 600
+
+# libyaml's C parser when PyYAML was built with it, the pure-Python one otherwise
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def log_and_print(msg, level=logging.INFO):
+    """
+    Report a message on the console and in the log file.
+    
+    Args:
+        msg (str): Message to report
+        level (int): Logging level for the log file entry
+    """
+    log.log(level, msg)
+    print(msg)
 
 class PipPackage:
     """
@@ -23,6 +39,8 @@ class PipPackage:
         name (str): Name of the package
         requirements_file (str, optional): Path to requirements file containing the package
     """
+    __slots__ = ("name", "requirements_file")
+
     def __init__(self, name, requirements_file=None):
         self.name = name
         self.requirements_file = requirements_file
@@ -34,9 +52,120 @@ class AptPackage:
     Attributes:
         name (str): Name of the package
     """
+    __slots__ = ("name",)
+
     def __init__(self, name):
         self.name = name
 
+def load_playbook(yaml_file_path):
+    """
+    Parse a playbook YAML file, reusing the previous parse when the file is unchanged.
+    
+    Args:
+        yaml_file_path (str): Path to the YAML file
+        
+    Returns:
+        The parsed YAML document
+        
+    Raises:
+        FileNotFoundError: If the YAML file does not exist
+        yaml.YAMLError: If the YAML cannot be parsed
+        
+    Logs:
+        - WARNING: If the parsed document cannot be cached
+        
+    Note:
+        - The parse is pickled to "<yaml_file_path>.pkl" together with the
+          file's mtime and size, and only reused while both still match
+        - Referenced requirements files are not part of the cache; they are
+          read fresh on every call
+    """
+    st = os.stat(yaml_file_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cache_file = f"{yaml_file_path}.pkl"
+    try:
+        with open(cache_file, 'rb') as fp:
+            cached_stamp, yaml_content = pickle.load(fp)
+        if cached_stamp == stamp:
+            return yaml_content
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        pass
+
+    # Read as bytes so the loader does its own decoding instead of going through a text stream
+    with open(yaml_file_path, 'rb') as file:
+        yaml_content = yaml.load(file, Loader=SafeLoader)
+
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, 'wb') as fp:
+            pickle.dump((stamp, yaml_content), fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        log.warning("Could not cache parsed YAML %s: %s", yaml_file_path, e)
+    return yaml_content
+
+# Everything after the project name: version specifiers, extras, markers, whitespace
+PIP_NAME_END = re.compile(r'[\s<>=!~;\[@]')
+
+def _pip_package_key(requirement):
+    """
+    Split a pip requirement line into its project name and constraint.
+    
+    Args:
+        requirement (str): Requirement line (e.g., "Foo_Bar >= 1.0")
+        
+    Returns:
+        tuple: (name, constraint) where name is the canonicalized (PEP 503)
+               project name and constraint is the rest of the line without
+               whitespace; a pip option line (e.g., "-r other.txt") is its own
+               name with an empty constraint
+    """
+    if requirement.startswith('-'):
+        return requirement, ''
+    name = PIP_NAME_END.split(requirement, 1)[0]
+    return canonicalize_name(name), ''.join(requirement[len(name):].split())
+
+def _apt_package_key(package):
+    """
+    Split an apt package entry into its name and version.
+    
+    Args:
+        package (str): Package entry (e.g., "curl" or "curl=7.81.0")
+        
+    Returns:
+        tuple: (name, version) with the name lowercased and an empty version
+               when the entry is not pinned
+    """
+    name, _, version = package.partition('=')
+    return name.strip().lower(), version.strip()
+
+def _add_package(packages, key, package):
+    """
+    Add a package to the ones found so far, listing each package name once.
+    
+    Args:
+        packages (dict): Maps each name to its (constraint, package object)
+        key (tuple): (name, constraint) of the package
+        package (PipPackage or AptPackage): Package to add
+        
+    Logs:
+        - WARNING: If the package is already listed with another constraint
+        
+    Note:
+        - An entry with a constraint replaces a bare entry of the same name,
+          keeping its position; a bare entry after a constrained one is dropped
+        - Of two different constraints the first is kept, so conflicting pins
+          never reach the same install call
+    """
+    name, constraint = key
+    listed = packages.get(name)
+    if listed is None or (constraint and not listed[0]):
+        packages[name] = (constraint, package)
+    elif constraint and constraint != listed[0]:
+        msg = (f"Conflicting entries for package '{name}': "
+               f"keeping '{listed[1].name}', ignoring '{package.name}'")
+        log_and_print(msg, logging.WARNING)
+
 def extract_packages(yaml_file_path):
     """
     Extract pip and apt packages from a YAML file.
@@ -53,46 +182,48 @@ def extract_packages(yaml_file_path):
     Note:
         - Handles both single package names and lists of package names
         - Processes requirements files referenced in the YAML
+        - Lists every package once, at its first occurrence; pip packages are
+          matched by canonicalized project name, apt packages by package name
+        - A pinned entry wins over a bare name, and of conflicting pins only
+          the first is kept (see _add_package)
+        - The YAML itself is parsed through load_playbook, which reuses the
+          previous parse while the file is unchanged
     """
-    pip_packages = []
-    apt_packages = []
-    with open(yaml_file_path, 'r') as file:
-        try:
-            yaml_content = yaml.safe_load(file)
-            for task in yaml_content:
-                if not isinstance(task, dict):
-                    continue
-                
-                # Extract pip packages
-                if 'pip' in task:
-                    pip_data = task['pip']
-                    if isinstance(pip_data, dict):
-                        if isinstance(pip_data.get('name'), str):
-                            names = [pip_data['name']]
-                        else:
-                            names = pip_data.get('name', [])
-                        for name in names:
-                            pip_packages.append(PipPackage(name))
-                        if 'requirements' in pip_data:
-                            req_file_path = pip_data['requirements']
-                            req_packages = read_requirements_file(req_file_path)
-                            for req_pkg in req_packages:
-                                pip_packages.append(PipPackage(req_pkg))
-                
-                # Extract apt packages
-                if 'apt' in task:
-                    apt_data = task['apt']
-                    if isinstance(apt_data, dict):
-                        names = apt_data.get('name', [])
-                        if isinstance(names, str):
-                            names = [names]
-                        for name in names:
-                            apt_packages.append(AptPackage(name))
-
-        except yaml.YAMLError as e:
-            logging.error(f"YAML parsing error in {yaml_file_path}: {e}")
-            print(f"Error parsing YAML file: {e}")
-    return pip_packages, apt_packages
+    # Keyed by package name so each package is installed once; dicts keep the original order
+    pip_packages = {}
+    apt_packages = {}
+    try:
+        yaml_content = load_playbook(yaml_file_path)
+        for task in yaml_content:
+            if not isinstance(task, dict):
+                continue
+            
+            # Extract pip packages
+            pip_data = task.get('pip')
+            if isinstance(pip_data, dict):
+                names = pip_data.get('name', [])
+                if isinstance(names, str):
+                    names = [names]
+                req_file_path = pip_data.get('requirements')
+                if req_file_path is not None:
+                    names = [*names, *read_requirements_file(req_file_path)]
+                for name in names:
+                    _add_package(pip_packages, _pip_package_key(name), PipPackage(name))
+            
+            # Extract apt packages
+            apt_data = task.get('apt')
+            if isinstance(apt_data, dict):
+                names = apt_data.get('name', [])
+                if isinstance(names, str):
+                    names = [names]
+                for name in names:
+                    _add_package(apt_packages, _apt_package_key(name), AptPackage(name))
+
+    except yaml.YAMLError as e:
+        log.error("YAML parsing error in %s: %s", yaml_file_path, e)
+        print(f"Error parsing YAML file: {e}")
+    return ([pkg for _, pkg in pip_packages.values()],
+            [pkg for _, pkg in apt_packages.values()])
 
 def read_requirements_file(requirements_file):
     """
@@ -111,19 +242,41 @@ def read_requirements_file(requirements_file):
     Note:
         Returns only non-empty lines from the file
     """
-    if os.path.exists(requirements_file):
-        try:
-            with open(requirements_file, 'r') as file:
-                return [line.strip() for line in file if line.strip()]
-        except IOError as e:
-            logging.error(f"Error reading requirements file {requirements_file}: {e}")
-            print(f"Error reading requirements file {requirements_file}: {e}")
-    else:
+    try:
+        with open(requirements_file, 'r') as file:
+            lines = file.read().splitlines()
+        return [stripped for stripped in map(str.strip, lines) if stripped]
+    except FileNotFoundError:
         msg = f"Requirements file not found: {requirements_file}"
-        logging.warning(msg)
-        print(msg)
+        log_and_print(msg, logging.WARNING)
+    except IOError as e:
+        log.error("Error reading requirements file %s: %s", requirements_file, e)
+        print(f"Error reading requirements file {requirements_file}: {e}")
     return []
 
+def run_install(cmd):
+    """
+    Run an install command with its progress output discarded.
+    
+    Args:
+        cmd (list): Command and arguments to run
+        
+    Raises:
+        subprocess.CalledProcessError: If the command exits non-zero
+        
+    Logs:
+        - ERROR: The command's stderr when it fails
+        
+    Note:
+        - pip and apt-get write hundreds of progress lines per package; only
+          stderr is kept, and it is only shown when the command fails
+    """
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    except subprocess.CalledProcessError as e:
+        log_and_print(f"{' '.join(cmd)} failed:\n{e.stderr.strip()}", logging.ERROR)
+        raise
+
 def install_pip_packages(packages):
     """
     Install Python packages using pip.
@@ -132,55 +285,119 @@ def install_pip_packages(packages):
         packages (list): List of PipPackage objects to install
         
     Logs:
-        - INFO: When installing a package
+        - INFO: When installing packages
         - ERROR: If installation fails
         
     Note:
-        Uses pip3 to install packages
+        - Uses a single pip3 call so pip resolves all packages together
+        - If that call fails, retries the packages one by one to report which failed
     """
-    for pkg in packages:
+    names = [pkg.name for pkg in packages]
+    if not names:
+        return
+    msg = f"Installing pip packages: {' '.join(names)}"
+    log_and_print(msg)
+    try:
+        run_install(["pip3", "install", *names])
+        return
+    except subprocess.CalledProcessError:
+        log.error("Batch pip install failed; retrying packages one by one.")
+    for name in names:
         try:
-            msg = f"Installing pip package: {pkg.name}"
-            print(msg)
-            logging.info(msg)
-            subprocess.run(["pip3", "install", pkg.name], check=True)
+            msg = f"Installing pip package: {name}"
+            log_and_print(msg)
+            run_install(["pip3", "install", name])
         except subprocess.CalledProcessError as e:
-            msg = f"Error installing pip package {pkg.name}: {e}"
-            logging.error(msg)
-            print(msg)
+            msg = f"Error installing pip package {name}: {e}"
+            log_and_print(msg, logging.ERROR)
+
+def start_apt_update():
+    """
+    Start refreshing the apt cache in the background, unless it is recent.
+    
+    Returns:
+        subprocess.Popen or None: The running `apt-get update`, to be handed to
+            install_apt_packages; None if the cache was refreshed less than
+            APT_CACHE_MAX_AGE seconds ago
+        
+    Logs:
+        - INFO: Whether the update is started or skipped
+    """
+    try:
+        age = time.time() - os.path.getmtime(APT_CACHE_FILE)
+    except OSError:
+        age = None
+    if age is not None and age <= APT_CACHE_MAX_AGE:
+        log.info("Apt cache refreshed %d seconds ago; skipping update.", age)
+        return None
+    log.info("Updating apt cache.")
+    print("Updating apt cache...")
+    return subprocess.Popen(["sudo", "apt-get", "update"])
 
-def install_apt_packages(packages):
+def install_apt_packages(packages, apt_update=None):
     """
     Install system packages using apt-get.
     
     Args:
         packages (list): List of AptPackage objects to install
+        apt_update (subprocess.Popen, optional): Cache update already started
+            with start_apt_update(); waited for instead of running a new one
         
     Logs:
         - INFO: When updating apt cache and installing packages
         - ERROR: If apt update or installation fails
         
     Note:
-        Updates apt cache before installing packages
+        - Updates apt cache before installing packages unless it is younger
+          than APT_CACHE_MAX_AGE; does nothing at all, not even the cache
+          update, when there are no packages
+        - Uses a single apt-get install call; if it fails, retries the packages
+          one by one to report which failed
     """
+    names = [pkg.name for pkg in packages]
+    if not names:
+        return
     try:
-        logging.info("Updating apt cache.")
-        print("Updating apt cache...")
-        subprocess.run(["sudo", "apt-get", "update"], check=True)
-        for pkg in packages:
+        if apt_update is None:
+            apt_update = start_apt_update()
+        if apt_update is not None and apt_update.wait() != 0:
+            raise subprocess.CalledProcessError(apt_update.returncode, apt_update.args)
+        msg = f"Installing apt packages: {' '.join(names)}"
+        log_and_print(msg)
+        try:
+            run_install(["sudo", "apt-get", "install", "-y", *names])
+            return
+        except subprocess.CalledProcessError:
+            log.error("Batch apt-get install failed; retrying packages one by one.")
+        for name in names:
             try:
-                msg = f"Installing apt package: {pkg.name}"
-                print(msg)
-                logging.info(msg)
-                subprocess.run(["sudo", "apt-get", "install", "-y", pkg.name], check=True)
+                msg = f"Installing apt package: {name}"
+                log_and_print(msg)
+                run_install(["sudo", "apt-get", "install", "-y", name])
             except subprocess.CalledProcessError as e:
-                msg = f"Error installing apt package {pkg.name}: {e}"
-                logging.error(msg)
-                print(msg)
+                msg = f"Error installing apt package {name}: {e}"
+                log_and_print(msg, logging.ERROR)
     except subprocess.CalledProcessError as e:
         msg = f"Error updating apt cache: {e}"
-        logging.error(msg)
-        print(msg)
+        log_and_print(msg, logging.ERROR)
+
+@functools.lru_cache(maxsize=1024)
+def _compile_pin_pattern(pkg_name):
+    """
+    Compile the version-pin pattern for a package once per process.
+    
+    Args:
+        pkg_name (str): Name of the package to match
+        
+    Returns:
+        re.Pattern: Case-insensitive pattern capturing (prefix, package, version, suffix)
+    """
+    # One case-insensitive, multi-line pattern for both formats, run over the whole file:
+    # 1. For list items: "  - package==version"
+    # 2. For single string: "  name: package==version"
+    # [^\S\n] is whitespace other than a newline, so a match never spans two lines
+    return re.compile(rf'^([^\S\n]*-[^\S\n]+|[^\S\n]*name:[^\S\n]+)({re.escape(pkg_name)})=='
+                      rf'([^\s]+)(.*)$', re.IGNORECASE | re.MULTILINE)
 
 def set_package_version(pkg_name, new_version, file_path):
     """
@@ -205,58 +422,43 @@ def set_package_version(pkg_name, new_version, file_path):
         - Preserves the original case of the package name
     """
     try:
-        if not Path(file_path).exists():
+        try:
+            with open(file_path, 'r') as file:
+                data = file.read()
+        except FileNotFoundError:
             msg = f"File not found: {file_path}"
-            logging.error(msg)
-            print(msg)
+            log_and_print(msg, logging.ERROR)
             return {"status": "error", "message": msg}
-        
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
     
-        # Case-insensitive regex patterns to match different formats:
-        # 1. For list items: "  - package==version"
-        # 2. For single string: "  name: package==version"
-        list_item_regex = re.compile(rf'^(\s*-\s+)({re.escape(pkg_name)})=='
-                                    rf'([^\s]+)(.*)$', re.IGNORECASE)
-        single_item_regex = re.compile(rf'^(\s*name:\s+)({re.escape(pkg_name)})=='
-                                      rf'([^\s]+)(.*)$', re.IGNORECASE)
-        
         updated = False
         package_found = False
         old_version = None
 
-        for idx, line in enumerate(lines):
-            # Try both patterns
-            list_match = list_item_regex.match(line)
-            single_match = single_item_regex.match(line)
-            
-            if list_match:
-                package_found = True
-                prefix, package_as_written, old_version, suffix = list_match.groups()
-                if old_version != new_version:
-                    # Use the original case of the package name from the file
-                    new_line = f"{prefix}{package_as_written}=={new_version}{suffix}\n"
-                    lines[idx] = new_line
-                    updated = True
-                    logging.info(f"Changing line from '{line.strip()}' to '{new_line.strip()}'")
-            
-            elif single_match:
-                package_found = True
-                prefix, package_as_written, old_version, suffix = single_match.groups()
-                if old_version != new_version:
-                    # Use the original case of the package name from the file
-                    new_line = f"{prefix}{package_as_written}=={new_version}{suffix}\n"
-                    lines[idx] = new_line
-                    updated = True
-                    logging.info(f"Changing line from '{line.strip()}' to '{new_line.strip()}'")
+        def replace_pin(pin_match):
+            nonlocal updated, package_found, old_version
+            package_found = True
+            prefix, package_as_written, old_version, suffix = pin_match.groups()
+            if old_version == new_version:
+                return pin_match.group(0)
+            # Use the original case of the package name from the file
+            new_line = f"{prefix}{package_as_written}=={new_version}{suffix}"
+            updated = True
+            log.info("Changing line from '%s' to '%s'", pin_match.group(0).strip(), new_line.strip())
+            return new_line
+
+        # Files that do not even mention the package skip the pattern entirely;
+        # the rest get a single substitution pass instead of a loop over their lines
+        if pkg_name.lower() in data.lower():
+            data = _compile_pin_pattern(pkg_name).sub(replace_pin, data)
 
         if updated:
-            with open(file_path, 'w') as file:
-                file.writelines(lines)
+            # Write beside the target and swap it in, so a crash never leaves a truncated file
+            tmp_path = f"{file_path}.tmp"
+            with open(tmp_path, 'w') as file:
+                file.write(data)
+            os.replace(tmp_path, file_path)
             msg = f"Updated '{pkg_name}' to version '{new_version}' in {file_path}"
-            logging.info(msg)
-            print(msg)
+            log_and_print(msg)
             return {
                 "status": "updated", 
                 "message": msg,
@@ -267,8 +469,7 @@ def set_package_version(pkg_name, new_version, file_path):
             }
         elif package_found:
             msg = f"'{pkg_name}' already at desired version '{new_version}' in {file_path}"
-            logging.info(msg)
-            print(msg)
+            log_and_print(msg)
             return {
                 "status": "unchanged", 
                 "message": msg,
@@ -278,8 +479,7 @@ def set_package_version(pkg_name, new_version, file_path):
             }
         else:
             msg = f"No package '{pkg_name}' found in {file_path} (case-insensitive search)"
-            logging.warning(msg)
-            print(msg)
+            log_and_print(msg, logging.WARNING)
             return {
                 "status": "not_found", 
                 "message": msg,
@@ -289,8 +489,7 @@ def set_package_version(pkg_name, new_version, file_path):
 
     except Exception as e:
         msg = f"Error updating '{pkg_name}' in {file_path}: {e}"
-        logging.error(msg)
-        print(msg)
+        log_and_print(msg, logging.ERROR)
         return {"status": "error", "message": msg, "package": pkg_name, "file": file_path}
 
 def main():
@@ -314,13 +513,7 @@ def main():
     """
     if len(sys.argv) == 5 and sys.argv[1] == 'set':
         pkg_name, new_version, file_path = sys.argv[2], sys.argv[3], sys.argv[4]
-        if not Path(file_path).exists():
-            msg = f"File not found: {file_path}"
-            print(msg)
-            logging.error(msg)
-            result = {"status": "error", "message": msg}
-            print(f"RESULT: {json.dumps(result)}")
-            sys.exit(1)
+        # A missing file comes back as an "error" result and exits 1 below
         result = set_package_version(pkg_name, new_version, file_path)
         # Print a special marker line that can be easily parsed by other scripts
         print(f"RESULT: {json.dumps(result)}")
@@ -331,42 +524,48 @@ def main():
 
     if len(sys.argv) != 2:
         msg = f"Usage: python3 {sys.argv[0]} <file.yml>"
-        print(msg)
-        logging.error(msg)
+        log_and_print(msg, logging.ERROR)
         sys.exit(1)
 
     yaml_file = sys.argv[1]
-    if not Path(yaml_file).exists():
+    try:
+        pip_packages, apt_packages = extract_packages(yaml_file)
+    except FileNotFoundError:
         msg = f"YAML file not found: {yaml_file}"
-        print(msg)
-        logging.error(msg)
+        log_and_print(msg, logging.ERROR)
         sys.exit(1)
 
-    pip_packages, apt_packages = extract_packages(yaml_file)
+    # apt-get update only touches apt's lists, so let it download while pip installs
+    apt_update = start_apt_update() if apt_packages else None
 
     if pip_packages:
         print(f"\nPip packages found in {yaml_file}:\n")
-        logging.info(f"Pip packages detected in {yaml_file}:")
+        log.info("Pip packages detected in %s:", yaml_file)
         for pkg in pip_packages:
             print(f"Package: {pkg.name}")
-            logging.info(f"Package: {pkg.name}")
+            log.info("Package: %s", pkg.name)
         install_pip_packages(pip_packages)
     else:
         msg = "No pip packages found."
-        print(msg)
-        logging.info(msg)
+        log_and_print(msg)
 
     if apt_packages:
         print(f"\nApt packages found in {yaml_file}:\n")
-        logging.info(f"Apt packages detected in {yaml_file}:")
+        log.info("Apt packages detected in %s:", yaml_file)
         for pkg in apt_packages:
             print(f"Package: {pkg.name}")
-            logging.info(f"Package: {pkg.name}")
-        install_apt_packages(apt_packages)
+            log.info("Package: %s", pkg.name)
+        install_apt_packages(apt_packages, apt_update)
     else:
         msg = "No apt packages found."
-        print(msg)
-        logging.info(msg)
+        log_and_print(msg)
 
 if __name__ == '__main__':
+    # Configure logging to write to a file with timestamp, level, and message
+    logging.basicConfig(
+        handlers=[BufferedFileHandler('resolve_dependencies.log')],
+        level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
     main()
@@ -1,6 +1,9 @@
 import subprocess
 import sys
-from packaging import version
+import itertools
+import importlib.metadata
+from _vercache import V
+from pypi_versions import get_release_versions
 
 def get_versions(package_name):
     # Run the pip3 index versions command and capture output
@@ -24,17 +27,31 @@ def parse_versions(output):
             installed = line.split(':', 1)[1].strip()
     return installed, versions
 
+def get_installed_and_available(package_name):
+    # PyPI's JSON API and the local metadata answer without starting pip; fall back to
+    # `pip3 index versions` when PyPI has no answer (e.g. only a pip-configured mirror is reachable)
+    versions = get_release_versions(package_name)
+    if not versions:
+        return parse_versions(get_versions(package_name))
+    try:
+        installed = importlib.metadata.version(package_name)
+    except importlib.metadata.PackageNotFoundError:
+        installed = None
+    # Newest first, as pip lists them
+    return installed, versions[::-1]
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python script.py <package_name>")
         sys.exit(1)
     package_name = sys.argv[1]
-    output = get_versions(package_name)
-    installed, versions = parse_versions(output)
+    installed, versions = get_installed_and_available(package_name)
     if not installed:
         print(f"No installed version found for {package_name}.")
         sys.exit(1)
-    newer_versions = [v for v in versions if version.parse(v) > version.parse(installed)]
+    # versions is newest first, so the newer ones are a prefix; stop at the first that is not
+    installed_version = V(installed)
+    newer_versions = list(itertools.takewhile(lambda v: V(v) > installed_version, versions))
     print(f"Installed version: {installed}")
     print("Available newer versions:")
     for v in newer_versions:
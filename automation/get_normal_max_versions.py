@@ -1,14 +1,41 @@
-import yaml
+import os
+import re
+import mmap
+import pickle
+import functools
 import sys
 import logging
-from packaging.version import Version
+from operator import itemgetter
+from typing import NamedTuple, Optional
+from _vercache import V
+from buffered_logging import BufferedFileHandler
 
-# Configure logging to write to a file with timestamp, level, and message
-logging.basicConfig(
-    filename='resolve_dependencies.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+log = logging.getLogger(__name__)
+
+# path -> (mtime_ns, size, lowercased packages); an entry is reused while the file is unchanged
+_requirements_cache = {}
+
+# Last index built by build_package_index, with the (file, stamp) pairs it was built from
+_package_index = {"key": None, "index": None}
+
+# "name==version" at the start of a line; trailing markers and comments are not part of the version
+REQUIREMENT_PIN = re.compile(rb'(?m)^[ \t]*([A-Za-z0-9_.\-]+)[ \t]*==[ \t]*([^\s;#]+)')
+
+class MaxResult(NamedTuple):
+    """Result of get_max_version_across_files; unpacks and prints like [version, file]."""
+    version: Optional[str]
+    file: Optional[str]
+
+    def __repr__(self) -> str:
+        return repr([self.version, self.file])
+
+NOT_FOUND = MaxResult(None, None)
+
+def _yaml():
+    """Import PyYAML on first use; it is only needed when a config has no current cached parse."""
+    import yaml
+    # libyaml's C parser when PyYAML was built with it, the pure-Python one otherwise
+    return yaml, getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 def load_config(config_file):
     """
@@ -23,15 +50,65 @@ def load_config(config_file):
     Logs:
         - INFO: When loading configuration
         - ERROR: If an exception occurs while loading the file
+        - WARNING: If the parsed configuration cannot be cached
+        
+    Note:
+        - The parse is pickled to "<config_file>.pkl" together with the file's
+          mtime and size, and reused while both still match
+        - Set PIPTOOLS_NO_CONFIG_CACHE to always parse the YAML
     """
-    logging.info(f"Loading configuration explicitly from: {config_file}")
+    log.info("Loading configuration explicitly from: %s", config_file)
+    use_cache = not os.environ.get("PIPTOOLS_NO_CONFIG_CACHE")
+    cache_file = f"{config_file}.pkl"
     try:
+        st = os.stat(config_file)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if use_cache:
+            try:
+                with open(cache_file, 'rb') as fp:
+                    cached_stamp, config = pickle.load(fp)
+                if cached_stamp == stamp:
+                    return config
+            except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+                pass
+        yaml, loader = _yaml()
         with open(config_file, 'r') as stream:
-            return yaml.safe_load(stream)
+            config = yaml.load(stream, Loader=loader)
     except Exception as e:
-        logging.error(f"Error loading config file '{config_file}': {e}")
+        log.error("Error loading config file '%s': %s", config_file, e)
         return None
 
+    if use_cache:
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, 'wb') as fp:
+                pickle.dump((stamp, config), fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            log.warning("Could not cache parsed config %s: %s", config_file, e)
+    return config
+
+def load_requirement_files(config_file):
+    """
+    Load only the requirement_files list from a YAML configuration file.
+    
+    Args:
+        config_file (str): Path to the YAML configuration file
+    
+    Returns:
+        list: Paths of the requirement files ([] if none are listed), or None if
+              the configuration cannot be loaded
+    
+    Logs:
+        - ERROR: If an exception occurs while loading the file
+    
+    Note:
+        - Goes through load_config, so an unchanged config is read from its
+          pickled parse without importing PyYAML
+    """
+    config = load_config(config_file)
+    return None if config is None else config.get('requirement_files', [])
+
 def read_requirements(file_path):
     """
     Read a requirements file and extract package names and versions.
@@ -47,22 +124,53 @@ def read_requirements(file_path):
         - ERROR: If file is not found or an error occurs while reading
         
     Note:
-        Only processes lines containing '==' to extract exact version requirements
+        Only processes lines containing '==' to extract exact version requirements.
+        The file is memory-mapped and scanned with a single bytes regex, so no
+        per-line decoding or splitting happens in Python.
     """
-    packages = {}
+    return {pkg.decode(): ver.decode() for pkg, ver in _scan_pins(file_path)}
+
+def _scan_pins(file_path):
+    """Return the (name, version) byte pairs pinned in a file; logs and returns [] on errors."""
     try:
-        with open(file_path, 'r') as fp:
-            logging.info(f"Reading requirements from: {file_path}")
-            for line in fp:
-                line = line.strip()
-                if line and '==' in line:
-                    pkg, ver = line.split('==')
-                    packages[pkg.strip()] = ver.strip()
+        with open(file_path, 'rb') as fp:
+            log.info("Reading requirements from: %s", file_path)
+            # mmap refuses empty files, and an empty file has no pins anyway
+            if os.fstat(fp.fileno()).st_size:
+                with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return REQUIREMENT_PIN.findall(mm)
     except FileNotFoundError:
-        logging.error(f"File not found explicitly: {file_path}")
+        log.error("File not found explicitly: %s", file_path)
     except Exception as e:
-        logging.error(f"Error reading from {file_path}: {e}")
-    return packages
+        log.error("Error reading from %s: %s", file_path, e)
+    return []
+
+def read_requirements_lower(file_path):
+    """
+    Read a requirements file keyed by lowercased package name, reusing earlier reads.
+    
+    Args:
+        file_path (str): Path to the requirements file
+        
+    Returns:
+        dict: Lowercased package name -> version; treat as read-only, it is shared
+        
+    Note:
+        - Parsed once per (mtime_ns, size) of the file; writes made through this
+          module drop the entry immediately
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        # Let _scan_pins report the missing or unreadable file
+        return {pkg.decode().lower(): ver.decode() for pkg, ver in _scan_pins(file_path)}
+    cached = _requirements_cache.get(file_path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    # Keys are lowercased as they are inserted, with no intermediate original-case dict
+    packages_lower = {pkg.decode().lower(): ver.decode() for pkg, ver in _scan_pins(file_path)}
+    _requirements_cache[file_path] = (st.st_mtime_ns, st.st_size, packages_lower)
+    return packages_lower
 
 def write_requirements(file_path, package_versions):
     """
@@ -81,11 +189,11 @@ def write_requirements(file_path, package_versions):
     """
     try:
         with open(file_path, 'w') as fp:
-            logging.info(f"Writing explicitly updated requirements to: {file_path}")
-            for pkg, ver in package_versions.items():
-                fp.write(f"{pkg}=={ver}\n")
+            log.info("Writing explicitly updated requirements to: %s", file_path)
+            fp.write("".join(f"{pkg}=={ver}\n" for pkg, ver in package_versions.items()))
+        _requirements_cache.pop(file_path, None)
     except Exception as e:
-        logging.error(f"Error writing requirements to '{file_path}': {e}")
+        log.error("Error writing requirements to '%s': %s", file_path, e)
 
 def get_package_version(file, package_name):
     """
@@ -103,19 +211,99 @@ def get_package_version(file, package_name):
         - WARNING: When package is not found
         
     Note:
-        Performs case-insensitive matching on package names
+        - Performs case-insensitive matching on package names
+        - Answered from the parsed file when it is already cached, otherwise
+          with a single search for this package's pin via find_one
     """
-    packages = read_requirements(file)
-    package_name_lower = package_name.lower()
-    packages_lower = {pkg.lower(): ver for pkg, ver in packages.items()}
-
-    version = packages_lower.get(package_name_lower)
+    cached = _requirements_cache.get(file)
+    if cached and cached[:2] == _file_stamp(file):
+        version = cached[2].get(package_name.lower())
+    else:
+        version = find_one(file, package_name)
     if version:
-        logging.info(f"Found {package_name} version in {file}: {version}")
+        log.info("Found %s version in %s: %s", package_name, file, version)
     else:
-        logging.warning(f"{package_name} not found in {file}")
+        log.warning("%s not found in %s", package_name, file)
     return version
 
+def find_one(file_path, package_name):
+    """
+    Find the pinned version of one package without parsing the whole file.
+    
+    Args:
+        file_path (str): Path to the requirements file
+        package_name (str): Name of the package to find
+    
+    Returns:
+        str: Version of the package, or None if it is not pinned in the file
+    
+    Logs:
+        - ERROR: If file is not found or an error occurs while reading
+    
+    Note:
+        - The file is memory-mapped and searched with a pattern built for this
+          package only, so no other pin is decoded or stored
+        - When a package is pinned twice the last pin wins, as in read_requirements
+    """
+    try:
+        with open(file_path, 'rb') as fp:
+            # mmap refuses empty files, and an empty file has no pins anyway
+            if not os.fstat(fp.fileno()).st_size:
+                return None
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                match = None
+                for match in _pin_line_pattern(package_name).finditer(mm):
+                    pass
+                return match.group(3).decode() if match else None
+    except FileNotFoundError:
+        log.error("File not found explicitly: %s", file_path)
+    except Exception as e:
+        log.error("Error reading from %s: %s", file_path, e)
+    return None
+
+def _file_stamp(file_path):
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def build_package_index(files):
+    """
+    Index the pinned versions of every package across several requirements files.
+    
+    Args:
+        files (list): List of paths to requirements files
+        
+    Returns:
+        dict: Lowercased package name -> list of (Version, version string, file)
+              in file order; treat as read-only, it is shared
+        
+    Logs:
+        - ERROR: When version format is invalid
+        
+    Note:
+        - Each version string is parsed once per index build
+        - The last index is reused while none of the files has changed
+    """
+    key = tuple((file, _file_stamp(file)) for file in files)
+    if _package_index["key"] == key:
+        return _package_index["index"]
+
+    index = {}
+    for file in files:
+        for pkg_lower, ver in read_requirements_lower(file).items():
+            try:
+                parsed = V(ver)
+            except Exception as e:
+                log.error("Invalid version format for %s in %s: %s - %s", pkg_lower, file, ver, e)
+                continue
+            index.setdefault(pkg_lower, []).append((parsed, ver, file))
+
+    _package_index["key"] = key
+    _package_index["index"] = index
+    return index
+
 def get_max_version_across_files(files, package_name):
     """
     Find the maximum version of a package across multiple requirements files.
@@ -125,7 +313,8 @@ def get_max_version_across_files(files, package_name):
         package_name (str): Name of the package to find
         
     Returns:
-        list: [max_version, file_with_max_version] or [None, None] if not found
+        MaxResult: (max_version, file_with_max_version), or NOT_FOUND (None, None)
+                   if the package is not pinned in any file
         
     Logs:
         - INFO: When max version is found
@@ -135,83 +324,107 @@ def get_max_version_across_files(files, package_name):
     Note:
         - Performs case-insensitive matching on package names
         - Uses packaging.version.Version for semantic version comparison
+        - Answered from build_package_index, so each file is parsed and each
+          version compared as a Version once while the files are unchanged
     """
-    package_name_lower = package_name.lower()
-    max_version = None
-    file_with_max_version = None
-
-    for file in files:
-        packages = read_requirements(file)
-        packages_lower = {pkg.lower(): ver for pkg, ver in packages.items()}
-
-        ver = packages_lower.get(package_name_lower)
-        if ver:
-            try:
-                current_version = Version(ver)
-                if not max_version or current_version > Version(max_version):
-                    max_version = ver
-                    file_with_max_version = file
-            except Exception as e:
-                logging.error(f"Invalid version format for {package_name} in {file}: {ver} - {e}")
-
-    if max_version:
-        logging.info(f"Max version of {package_name} across files: {max_version} found in {file_with_max_version}")
-        return [max_version, file_with_max_version]
+    entries = build_package_index(files).get(package_name.lower())
+    if entries:
+        # max() keeps the first of equal versions, so ties go to the earliest file
+        _, max_version, file_with_max_version = max(entries, key=itemgetter(0))
+        log.info("Max version of %s across files: %s found in %s", package_name, max_version, file_with_max_version)
+        return MaxResult(max_version, file_with_max_version)
     else:
-        logging.warning(f"{package_name} not found in any files.")
-        return [None, None]
+        log.warning("%s not found in any files.", package_name)
+        return NOT_FOUND
 
-def update_package_version_in_file(file, package_name, new_version):
+@functools.lru_cache(maxsize=1024)
+def _pin_line_pattern(*package_names):
+    """Compile the pattern matching the packages' pins as (indent, name, version, rest of line)."""
+    names = b'|'.join(re.escape(name.encode()) for name in package_names)
+    return re.compile(rb'^([ \t]*)(' + names + rb')[ \t]*==[ \t]*([^\s;#]+)(.*)$',
+                      re.MULTILINE | re.IGNORECASE)
+
+def update_many(file, updates):
     """
-    Update the version of a specific package in a requirements file.
+    Update the versions of several packages in a requirements file in one rewrite.
     
     Args:
         file (str): Path to the requirements file
-        package_name (str): Name of the package to update
-        new_version (str): New version to set for the package
+        updates (dict): Package name -> new version to set for it
         
     Returns:
-        bool: True if update was successful, False otherwise
+        set: Names (as given in updates) of the packages that were updated, or
+             None if an error occurred
         
     Logs:
-        - INFO: When package is updated
-        - WARNING: When package is not found
+        - INFO: When a package is updated
+        - WARNING: When a package is not found
         - ERROR: When an error occurs during update
         
     Note:
         - Performs case-insensitive matching on package names
         - Preserves comments and formatting in the file
-        - Only updates lines that contain '==' and match the package name
+        - Only updates lines that contain '==' and match a package name
+        - The file is memory-mapped and rewritten with one regex substitution
+          covering every package; it is only written, via a temporary file and
+          a rename, when a pin changed
     """
-    package_name_lower = package_name.lower()
-    updated = False
+    # Lowercased name -> (name as given, new version as bytes)
+    targets = {name.lower(): (name, version.encode()) for name, version in updates.items()}
+    updated = set()
+    if not targets:
+        return updated
 
-    try:
-        with open(file, 'r') as fp:
-            lines = fp.readlines()
-
-        with open(file, 'w') as fp:
-            for line in lines:
-                line_stripped = line.strip()
-                if line_stripped and not line_stripped.startswith('#') and '==' in line_stripped:
-                    pkg, ver = line_stripped.split('==', 1)
-                    if pkg.strip().lower() == package_name_lower:
-                        line = f"{pkg.strip()}=={new_version}\n"
-                        updated = True
-                        logging.info(f"Updating {package_name} from {ver.strip()} to {new_version} explicitly in {file}")
+    def replace_pin(match):
+        indent, pkg, ver, rest = match.groups()
+        name, new_version_bytes = targets[pkg.decode().lower()]
+        updated.add(name)
+        if log.isEnabledFor(logging.INFO):
+            log.info("Updating %s from %s to %s explicitly in %s", name, ver.decode(), updates[name], file)
+        return indent + pkg + b"==" + new_version_bytes + rest
 
-                fp.write(line)
+    try:
+        with open(file, 'rb') as fp:
+            # mmap refuses empty files, and an empty file has nothing to update
+            if os.fstat(fp.fileno()).st_size:
+                with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    data = _pin_line_pattern(*sorted(targets)).sub(replace_pin, mm)
 
         if updated:
-            logging.info(f"Successfully updated {package_name} to version {new_version} explicitly in {file}")
-            return True
-        else:
-            logging.warning(f"{package_name} not found explicitly in {file}; no update made.")
-            return False
+            # Write beside the target and swap it in, so readers never see a partial file
+            tmp_file = f"{file}.tmp"
+            with open(tmp_file, 'wb') as fp:
+                fp.write(data)
+            os.replace(tmp_file, file)
+            _requirements_cache.pop(file, None)
+        for name, version in updates.items():
+            if name in updated:
+                log.info("Successfully updated %s to version %s explicitly in %s", name, version, file)
+            else:
+                log.warning("%s not found explicitly in %s; no update made.", name, file)
+        return updated
 
     except Exception as e:
-        logging.error(f"Error while updating requirements file '{file}': {e}")
-        return False
+        log.error("Error while updating requirements file '%s': %s", file, e)
+        return None
+
+def update_package_version_in_file(file, package_name, new_version):
+    """
+    Update the version of a specific package in a requirements file.
+    
+    Args:
+        file (str): Path to the requirements file
+        package_name (str): Name of the package to update
+        new_version (str): New version to set for the package
+        
+    Returns:
+        bool: True if update was successful, False otherwise
+        
+    Note:
+        - A single-package update_many; see it for matching, logging and how
+          the file is rewritten
+    """
+    return bool(update_many(file, {package_name: new_version}))
 
 # Main script execution
 if __name__ == "__main__":
@@ -236,21 +449,26 @@ if __name__ == "__main__":
     Logs:
         - ERROR: When incorrect usage or configuration loading fails
     """
+    # Configure logging to write to a file with timestamp, level, and message
+    logging.basicConfig(
+        handlers=[BufferedFileHandler('resolve_dependencies.log')],
+        level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
     if len(sys.argv) < 2:
-        logging.error("No action provided. Exiting explicitly.")
+        log.error("No action provided. Exiting explicitly.")
         sys.exit(1)
 
-    config = load_config("files_config.yml")
-    if not config:
-        logging.error("Configuration loading failed explicitly. Exiting.")
+    files = load_requirement_files("files_config.yml")
+    if files is None:
+        log.error("Configuration loading failed explicitly. Exiting.")
         sys.exit(1)
 
-    files = config.get('requirement_files', [])
     action = sys.argv[1]
 
     if action == "get":
         if len(sys.argv) != 4:
-            logging.error("Incorrect usage clearly for 'get'.")
+            log.error("Incorrect usage clearly for 'get'.")
             sys.exit(1)
         _, _, package_name, file = sys.argv
         version = get_package_version(file, package_name)
@@ -261,7 +479,7 @@ if __name__ == "__main__":
 
     elif action == "max":
         if len(sys.argv) != 3:
-            logging.error("Incorrect usage clearly for 'max'.")
+            log.error("Incorrect usage clearly for 'max'.")
             sys.exit(1)
         _, _, package_name = sys.argv
         max_ver, found_file = get_max_version_across_files(files, package_name)
@@ -272,7 +490,7 @@ if __name__ == "__main__":
 
     elif action == "set":
         if len(sys.argv) != 5:
-            logging.error("Incorrect usage clearly for 'set'.")
+            log.error("Incorrect usage clearly for 'set'.")
             sys.exit(1)
         _, _, package_name, new_version, file = sys.argv
         success = update_package_version_in_file(file, package_name, new_version)
@@ -280,5 +498,5 @@ if __name__ == "__main__":
             sys.exit(1)
 
     else:
-        logging.error(f"Invalid action '{action}' specified explicitly; exiting explicitly.")
+        log.error("Invalid action '%s' specified explicitly; exiting explicitly.", action)
         sys.exit(1)
@@ -1,7 +1,7 @@
 import re
 import subprocess
 import argparse
-from packaging import version
+from _vercache import V
 
 def get_package_dependency_tree(package_name):
     try:
@@ -41,7 +41,7 @@ def compare_versions(required, installed):
     # Extract version number from required version constraint
     required_version = re.match(r'^[^\d]*([\d\.]+)', required).group(1)
     
-    if version.parse(installed) < version.parse(required_version):
+    if V(installed) < V(required_version):
         return 'problematic'
     return 'ok'
 
@@ -1,61 +1,34 @@
 import re
-import subprocess
 import argparse
-from packaging import specifiers, version
+from packaging import specifiers
+from _vercache import V
+from packaging.utils import canonicalize_name
+from installed_packages import installed_distributions, dependency_tree, get_reverse_dependencies, format_specifier
 
-def get_package_dependency_tree(package_name, reverse=False):
-    command = ["pipdeptree", "-p", package_name]
-    if reverse:
-        command.append("--reverse")
-    
-    try:
-        result = subprocess.run(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-            check=True,
-            text=True
-        )
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        print(f"Error running pipdeptree: {e}")
+def get_package_dependencies(package_name):
+    # Walk installed metadata in-process instead of running and parsing `pipdeptree -p`
+    key = canonicalize_name(package_name)
+    if key not in installed_distributions():
         return None
+    # dependency_tree also lists the transitive dependencies; only the direct ones are wanted
+    for entry in dependency_tree(package_name):
+        if entry["package"]["key"] == key:
+            return [
+                (dep["package_name"], dep["required_version"], dep["installed_version"])
+                for dep in entry["dependencies"]
+            ]
+    return []
 
-def parse_package_data(data):
-    packages = []
-    lines = data.strip().split('\n')
-    
-    for line in lines:
-        match = re.match(r'^[├└│─]*\s*(\S+)\s\[required:\s*([^,]+),\s*installed:\s*(\S+)\]', line)
-        if match:
-            name = match.group(1)
-            required_version = match.group(2).strip()
-            installed_version = match.group(3).strip()
-            packages.append((name, required_version, installed_version))
-    
-    return packages
-
-def parse_reverse_package_data(data):
-    packages = []
-    installed_version = None
-    lines = data.strip().split('\n')
-    
-    for line in lines:
-        # Extract the main package version
-        match = re.match(r'^(\S+)==([\d\.]+)', line)
-        if match:
-            installed_version = match.group(2)
-            continue
-        
-        # Extract the reverse dependency lines
-        match = re.match(r'^[├└│─]*\s*(\S+)==([\d\.]+)\s\[requires:\s*(.*)\]', line)
-        if match:
-            name = match.group(1)  # Get package name only for reverse case
-            current_version = match.group(2)
-            required_version = match.group(3).strip()
-            packages.append((name, current_version, required_version))
-    
-    return installed_version, packages
+def get_reverse_package_dependencies(package_name):
+    # Same answer as `pipdeptree -p <pkg> --reverse`, straight from installed metadata
+    dist = installed_distributions().get(canonicalize_name(package_name))
+    if dist is None:
+        return None, []
+    packages = [
+        (name, current_version, format_specifier(specifier))
+        for name, current_version, specifier in get_reverse_dependencies(package_name)
+    ]
+    return dist.version, packages
 
 def validate_reverse_dependencies(installed_version, packages, main_package_name):
     problems_found = False
@@ -72,7 +45,7 @@ def validate_reverse_dependencies(installed_version, packages, main_package_name
         
         try:
             specifier_set = specifiers.SpecifierSet(required_version)
-            if not version.parse(installed_version) in specifier_set:
+            if not V(installed_version) in specifier_set:
                 print(f"{name}: requires {main_package_name} {required_version} [NOT OK]")
                 problems_found = True
                 problematic_packages.append((name, current_version))
@@ -94,7 +67,7 @@ def compare_versions(required, installed):
     # Extract version number from required version constraint
     required_version = re.match(r'^[^\d]*([\d\.]+)', required).group(1)
     
-    if version.parse(installed) < version.parse(required_version):
+    if V(installed) < V(required_version):
         return 'problematic'
     return 'ok'
 
@@ -119,11 +92,14 @@ def main():
     parser.add_argument("--reverse", action="store_true", help="Check reverse dependencies.")
     args = parser.parse_args()
     
-    package_data = get_package_dependency_tree(args.package_name, reverse=args.reverse)
+    if args.reverse:
+        installed_version, package_list = get_reverse_package_dependencies(args.package_name)
+        package_data = installed_version
+    else:
+        package_list = package_data = get_package_dependencies(args.package_name)
     
-    if package_data:
+    if package_data is not None:
         if args.reverse:
-            installed_version, package_list = parse_reverse_package_data(package_data)
             problems_found, problematic_packages = validate_reverse_dependencies(installed_version, package_list, args.package_name)
             print("\nAll checks complete.")
             if problems_found:
@@ -133,7 +109,6 @@ def main():
             else:
                 print("No problematic packages found in the reverse dependencies.")
         else:
-            package_list = parse_package_data(package_data)
             problematic_packages = highlight_packages(package_list)
             if problematic_packages:
                 print("\nProblematic packages and their required versions:")
@@ -1,19 +1,18 @@
 import subprocess
 import sys
 import logging
-from packaging.version import Version, InvalidVersion
+import bisect
+import functools
+import operator
+from packaging.version import InvalidVersion
+from pypi_versions import get_release_version_index, prefetch_versions
+from _vercache import V as _ver
 
-# Unified logging (appending to existing log file)
-logging.basicConfig(
-    filename='resolve_dependencies.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+log = logging.getLogger(__name__)
 
 def get_available_versions(package_name):
     """
-    Fetch available versions from PyPI using pip3 explicitly.
+    Fetch available versions from PyPI.
     
     This function queries PyPI for all available versions of a package,
     validates each version, and returns them in sorted order.
@@ -30,111 +29,189 @@ def get_available_versions(package_name):
         - ERROR: If any unexpected error occurs
         
     Note:
-        - Uses pip3 index versions command
+        - Uses the PyPI JSON API, falling back to pip3 index versions
         - Filters out invalid versions
         - Returns an empty list if any error occurs
     """
+    return [ver for _, ver in get_parsed_available_versions(package_name)]
+
+def get_available_versions_batch(package_names, max_workers=16):
+    """
+    Fetch available versions for several packages, querying PyPI concurrently.
+    
+    Args:
+        package_names (iterable): Names of the packages to query
+        max_workers (int): Maximum number of concurrent PyPI requests
+        
+    Returns:
+        dict: Package name -> sorted list of valid version strings (ascending order)
+        
+    Note:
+        - The JSON API lookups run in a thread pool, each thread reusing one
+          keep-alive connection; main() calls made afterwards for these
+          packages are answered from the warmed caches
+    """
+    names = list(dict.fromkeys(package_names))
+    prefetch_versions(names, max_workers=max_workers)
+    return {name: get_available_versions(name) for name in names}
+
+def get_available_version_index(package_name):
+    """
+    Fetch available versions from PyPI, parsed and ready to bisect.
+    
+    Args:
+        package_name (str): Name of the package to query
+        
+    Returns:
+        tuple: ((Version, version string) tuples sorted ascending, the Versions
+               alone in the same order); both empty if any error occurs
+        
+    Logs:
+        - ERROR: If PyPI cannot be queried, pip command fails or any unexpected error occurs
+        
+    Note:
+        - Reads the PyPI JSON API through pypi_versions, which caches the result
+          in-process and on disk; no pip subprocess is started on that path
+        - Falls back to `pip3 index versions` when the JSON API has no answer,
+          e.g. behind a pip-configured mirror that PyPI itself is not reachable from
+        - Each version string is parsed once per process, and both sequences
+          are built once per package; callers must not modify them
+    """
+    versions, parsed_only = get_release_version_index(package_name)
+    if versions:
+        return versions, parsed_only
     try:
-        output = subprocess.check_output(
-            ["pip3", "index", "versions", package_name],
-            text=True, stderr=subprocess.DEVNULL
-        )
-        versions = []
-        for line in output.strip().splitlines():
-            line = line.strip()
-            if line.startswith('Available versions:'):
-                line = line.replace('Available versions:', '').strip()
-                version_list = line.split(',')
-                for v in version_list:
-                    ver_clean = v.strip()
-                    try:
-                        Version(ver_clean)  # explicit valid version check
-                        versions.append(ver_clean)
-                    except InvalidVersion as e:
-                        logging.error(f"Invalid version '{ver_clean}' skipped for '{package_name}': {e}")
-                break
-        versions.sort(key=Version)
-        return versions
+        return _index_versions(package_name)
     except subprocess.CalledProcessError as e:
-        logging.error(f"Failed to get available versions for '{package_name}': {e}")
-        return []
+        log.error("Failed to get available versions for '%s': %s", package_name, e)
+        return (), ()
     except Exception as e:
-        logging.error(f"Unexpected error fetching versions for '{package_name}': {e}")
-        return []
+        log.error("Unexpected error fetching versions for '%s': %s", package_name, e)
+        return (), ()
+
+def get_parsed_available_versions(package_name):
+    """
+    Fetch available versions from PyPI, already parsed.
+    
+    Args:
+        package_name (str): Name of the package to query
+        
+    Returns:
+        list: (Version, version string) tuples sorted ascending; empty if any error occurs
+    """
+    return list(get_available_version_index(package_name)[0])
+
+@functools.lru_cache(maxsize=512)
+def _index_versions(package_name):
+    """
+    Run `pip3 index versions` once per package and keep the sorted result.
+    
+    Args:
+        package_name (str): Name of the package to query
+        
+    Returns:
+        tuple: ((Version, version string) tuples of valid versions sorted ascending,
+                the Versions alone in the same order)
+        
+    Raises:
+        subprocess.CalledProcessError: If pip fails; errors are raised rather
+            than returned so failed lookups are not memoized
+    """
+    output = subprocess.check_output(
+        ["pip3", "index", "versions", package_name],
+        text=True, stderr=subprocess.DEVNULL
+    )
+    versions = []
+    for line in output.strip().splitlines():
+        line = line.strip()
+        if line.startswith('Available versions:'):
+            line = line.replace('Available versions:', '').strip()
+            version_list = line.split(',')
+            for v in version_list:
+                ver_clean = v.strip()
+                try:
+                    versions.append((_ver(ver_clean), ver_clean))
+                except InvalidVersion as e:
+                    log.error("Invalid version '%s' skipped for '%s': %s", ver_clean, package_name, e)
+            break
+    versions.sort(key=operator.itemgetter(0))
+    return tuple(versions), tuple(version for version, _ in versions)
 
 def main(package_name, input_version, flags):
     """
-    Find versions of a package greater than the input version and output
+    Find versions of a package greater than the input version and return
     specific versions based on provided flags.
     
     This function:
     1. Gets all available versions for the package
     2. Filters versions greater than the input version
     3. Calculates first, latest, and trail versions
-    4. Outputs requested versions based on flags
+    4. Returns requested versions based on flags
     
     Args:
         package_name (str): Name of the package to analyze
         input_version (str): Version to compare against
-        flags (list): List of flags determining which versions to output
+        flags (list): List of flags determining which versions to return
                      (--first, --latest, --trail)
         
     Returns:
-        None: Results are printed to stdout
-        
-    Exits:
-        - With code 1 if no versions are found
-        - With code 1 if input version is invalid
-        - With code 0 if no higher versions are found
+        dict or None: Requested versions keyed by 'first', 'latest' and 'trail';
+                      an empty dict if no higher versions exist;
+                      None if no versions are found or the input version is invalid
         
     Logs:
         - INFO: When checking versions
         - ERROR: If no versions are found
         - ERROR: If input version is invalid
-        - INFO: When outputting specific versions
+        - INFO: When returning specific versions
         
     Note:
         - Trail version is calculated as the middle point between first and latest
-        - Only outputs versions requested by flags
+        - Only returns versions requested by flags
     """
-    logging.info(f"Checking available versions for '{package_name}' greater than '{input_version}'")
+    log.info("Checking available versions for '%s' greater than '%s'", package_name, input_version)
 
-    versions = get_available_versions(package_name)
+    versions, parsed_only = get_available_version_index(package_name)
     if not versions:
-        logging.error(f"No available versions found explicitly for '{package_name}'.")
-        sys.exit(1)
+        log.error("No available versions found explicitly for '%s'.", package_name)
+        return None
 
     try:
-        input_ver = Version(input_version)
+        input_ver = _ver(input_version)
     except InvalidVersion as e:
-        logging.error(f"Invalid input version '{input_version}' for package '{package_name}': {e}")
-        sys.exit(1)
+        log.error("Invalid input version '%s' for package '%s': %s", input_version, package_name, e)
+        return None
 
-    higher_versions = [v for v in versions if Version(v) > input_ver]
+    # versions is sorted ascending, so everything after the bisection point is higher;
+    # parsed_only holds the same Versions alone, as bisect only takes key= from Python 3.10
+    first_index = bisect.bisect_right(parsed_only, input_ver)
+    latest_index = len(versions) - 1
 
-    if not higher_versions:
-        logging.info(f"No higher versions than '{input_version}' available explicitly for '{package_name}'. Nothing to do.")
-        sys.exit(0)
+    if first_index > latest_index:
+        log.info("No higher versions than '%s' available explicitly for '%s'. Nothing to do.", input_version, package_name)
+        return {}
 
-    first_higher_version = higher_versions[0]
-    latest_version = higher_versions[-1]
+    first_higher_version = versions[first_index][1]
+    latest_version = versions[latest_index][1]
 
-    first_index = versions.index(first_higher_version)
-    latest_index = versions.index(latest_version)
     trail_index = (first_index + latest_index) // 2
-    trail_version = versions[trail_index]
+    trail_version = versions[trail_index][1]
+
+    selected_versions = {}
 
     if '--first' in flags:
-        logging.info(f"Package '{package_name}': first higher version after '{input_version}' -> '{first_higher_version}'.")
-        print(first_higher_version)
+        log.info("Package '%s': first higher version after '%s' -> '%s'.", package_name, input_version, first_higher_version)
+        selected_versions['first'] = first_higher_version
 
     if '--latest' in flags:
-        logging.info(f"Latest version after '{input_version}' for '{package_name}': {latest_version}")
-        print(latest_version)
+        log.info("Latest version after '%s' for '%s': %s", input_version, package_name, latest_version)
+        selected_versions['latest'] = latest_version
 
     if '--trail' in flags:
-        logging.info(f"Trail version for '{package_name}' after '{input_version}': {trail_version}")
-        print(trail_version)
+        log.info("Trail version for '%s' after '%s': %s", package_name, input_version, trail_version)
+        selected_versions['trail'] = trail_version
+
+    return selected_versions
 
 if __name__ == "__main__":
     """
@@ -153,14 +230,23 @@ if __name__ == "__main__":
     
     Exits:
         - With code 1 if arguments are missing or invalid
+        - With code 1 if no versions are found or input version is invalid
+        - With code 0 if no higher versions are found
         - With code 1 if an unexpected error occurs
     
     Logs:
         - ERROR: If arguments are missing or invalid
         - ERROR: If an unexpected error occurs
     """
+    # Unified logging (appending to existing log file)
+    logging.basicConfig(
+        filename='resolve_dependencies.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
     if len(sys.argv) < 4:
-        logging.error(f"Incorrect usage. Provided arguments: {sys.argv}")
+        log.error("Incorrect usage. Provided arguments: %s", sys.argv)
         print(f"Usage: python3 {sys.argv[0]} <package_name> <input_version> [--first] [--latest] [--trail]")
         sys.exit(1)
 
@@ -169,7 +255,12 @@ if __name__ == "__main__":
     flags = sys.argv[3:]
 
     try:
-        main(package_name, input_version, flags)
+        selected_versions = main(package_name, input_version, flags)
     except Exception as e:
-        logging.exception(f"Unhandled exception for '{package_name}' {input_version}: {e}")
+        log.exception("Unhandled exception for '%s' %s: %s", package_name, input_version, e)
+        sys.exit(1)
+
+    if selected_versions is None:
         sys.exit(1)
+    for selected_version in selected_versions.values():
+        print(selected_version)
@@ -0,0 +1,188 @@
+import threading
+import importlib
+import importlib.metadata
+from packaging.utils import canonicalize_name
+from packaging.requirements import Requirement, InvalidRequirement
+from packaging.version import InvalidVersion
+from _vercache import V
+
+_lock = threading.Lock()
+_distributions = None
+_reverse_map = None
+
+def installed_distributions():
+    """
+    Map every installed distribution by its canonical name.
+
+    Returns:
+        dict: Canonical package name -> importlib.metadata.Distribution
+
+    Note:
+        - The environment is scanned once per process; call invalidate_cache()
+          after installing or removing packages
+        - When a name is installed twice, the first entry on sys.path wins,
+          matching what an import would pick up
+    """
+    global _distributions
+    with _lock:
+        if _distributions is None:
+            distributions = {}
+            for dist in importlib.metadata.distributions():
+                name = dist.metadata["Name"]
+                if name:
+                    distributions.setdefault(canonicalize_name(name), dist)
+            _distributions = distributions
+        return _distributions
+
+def invalidate_cache():
+    """Forget the scanned environment so the next lookup rescans it."""
+    global _distributions, _reverse_map
+    with _lock:
+        _distributions = None
+        _reverse_map = None
+    # Drop importlib's own path/metadata caches so fresh installs are seen
+    importlib.invalidate_caches()
+
+def get_requirements(dist):
+    """
+    Parse the unconditional requirements of an installed distribution.
+
+    Args:
+        dist (importlib.metadata.Distribution): Installed distribution
+
+    Returns:
+        list: packaging.requirements.Requirement objects
+
+    Note:
+        - Requirements only pulled in by extras or by markers that do not
+          match the running interpreter are skipped, as pipdeptree does
+        - Unparseable requirement strings are ignored
+    """
+    requirements = []
+    for requirement_str in dist.requires or []:
+        try:
+            req = Requirement(requirement_str)
+        except InvalidRequirement:
+            continue
+        if req.marker is None or req.marker.evaluate({"extra": ""}):
+            requirements.append(req)
+    return requirements
+
+def _clause_order(clause):
+    # Wildcard ("==1.*") and arbitrary ("===foo") versions sort after the parseable ones
+    version = clause.version[:-2] if clause.version.endswith(".*") else clause.version
+    try:
+        return (0, V(version), str(clause))
+    except InvalidVersion:
+        return (1, clause.version, str(clause))
+
+def format_specifier(specifier):
+    """
+    Render a SpecifierSet the way pipdeptree prints it.
+
+    Args:
+        specifier (SpecifierSet): Parsed version specifier
+
+    Returns:
+        str: Comma-joined clauses ordered by version, ascending, as pipdeptree
+            orders them (e.g. ">=3.0.30,!=3.0.37,<3.1.0"), or "" for an empty
+            specifier
+    """
+    return ",".join(str(clause) for clause in sorted(specifier, key=_clause_order))
+
+def dependency_tree(package_name=None):
+    """
+    Build the same structure that `pipdeptree --json` prints.
+
+    Args:
+        package_name (str, optional): Restrict the tree to this package and
+            its transitive dependencies, like `pipdeptree -p`
+
+    Returns:
+        list: Entries of the form
+            {"package": {"key", "package_name", "installed_version"},
+             "dependencies": [{"key", "package_name", "installed_version",
+                               "required_version"}, ...]}
+
+    Note:
+        - Missing dependencies report "?" as installed version and an empty
+          specifier is reported as "Any", matching pipdeptree
+        - Packages and their dependencies are sorted by key, as pipdeptree sorts them
+    """
+    distributions = installed_distributions()
+
+    if package_name is None:
+        keys = list(distributions)
+    else:
+        keys = []
+        pending = [canonicalize_name(package_name)]
+        seen = set()
+        while pending:
+            key = pending.pop()
+            if key in seen or key not in distributions:
+                continue
+            seen.add(key)
+            keys.append(key)
+            pending.extend(canonicalize_name(req.name) for req in get_requirements(distributions[key]))
+
+    tree = []
+    for key in sorted(keys):
+        dist = distributions[key]
+        dependencies = []
+        for req in sorted(get_requirements(dist), key=lambda req: canonicalize_name(req.name)):
+            dep_key = canonicalize_name(req.name)
+            dep_dist = distributions.get(dep_key)
+            dependencies.append({
+                "key": dep_key,
+                "package_name": dep_dist.metadata["Name"] if dep_dist else req.name,
+                "installed_version": dep_dist.version if dep_dist else "?",
+                "required_version": format_specifier(req.specifier) or "Any",
+            })
+        tree.append({
+            "package": {
+                "key": key,
+                "package_name": dist.metadata["Name"],
+                "installed_version": dist.version,
+            },
+            "dependencies": dependencies,
+        })
+    return tree
+
+def reverse_dependency_map():
+    """
+    Map each package to the installed distributions that require it.
+
+    Returns:
+        dict: Canonical package name -> list of
+            (dependent_name, dependent_version, SpecifierSet) tuples
+
+    Note:
+        - Built once per process from installed metadata; reset together with
+          installed_distributions() by invalidate_cache()
+    """
+    global _reverse_map
+    distributions = installed_distributions()
+    with _lock:
+        if _reverse_map is None:
+            reverse_map = {}
+            for dist in distributions.values():
+                for req in get_requirements(dist):
+                    reverse_map.setdefault(canonicalize_name(req.name), []).append(
+                        (dist.metadata["Name"], dist.version, req.specifier)
+                    )
+            _reverse_map = reverse_map
+        return _reverse_map
+
+def get_reverse_dependencies(package_name):
+    """
+    List the installed distributions that directly require a package.
+
+    Args:
+        package_name (str): Name of the required package
+
+    Returns:
+        list: (dependent_name, dependent_version, SpecifierSet) tuples sorted
+            by dependent name
+    """
+    dependents = reverse_dependency_map().get(canonicalize_name(package_name), [])
+    return sorted(dependents, key=lambda entry: entry[0].lower())
@@ -0,0 +1,290 @@
+import os
+import gzip
+import json
+import time
+import logging
+import functools
+import operator
+import threading
+import http.client
+import urllib.error
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion
+from _vercache import V
+
+PYPI_HOST = "pypi.org"
+PYPI_JSON_PATH = "/pypi/{}/json"
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pip-tools-automation", "pypi")
+CACHE_TTL = 3600
+REQUEST_TIMEOUT = 10
+MAX_REDIRECTS = 3
+
+log = logging.getLogger(__name__)
+
+# One keep-alive HTTPS connection per thread, so the TLS handshake is paid once per worker
+_local = threading.local()
+
+def _cache_path(package_name):
+    return os.path.join(CACHE_DIR, f"{canonicalize_name(package_name)}.json")
+
+def _read_disk_cache(package_name):
+    """
+    Return the cached entry for a package, fresh or not.
+
+    Args:
+        package_name (str): Name of the package
+
+    Returns:
+        tuple or None: (version strings, ETag or None, True if younger than
+            CACHE_TTL), or None on a miss
+    """
+    path = _cache_path(package_name)
+    try:
+        fresh = time.time() - os.path.getmtime(path) <= CACHE_TTL
+        with open(path, 'r') as fp:
+            entry = json.load(fp)
+        return entry["versions"], entry.get("etag"), fresh
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _write_disk_cache(package_name, versions, etag=None):
+    """
+    Persist a version list for a package, replacing any previous entry atomically.
+
+    Args:
+        package_name (str): Name of the package
+        versions (list): Version strings to store
+        etag (str, optional): ETag PyPI sent with the release list
+
+    Logs:
+        - WARNING: If the cache directory or file cannot be written
+    """
+    path = _cache_path(package_name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'w') as fp:
+            json.dump({"versions": versions, "etag": etag}, fp)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log.warning("Could not write PyPI version cache for '%s': %s", package_name, e)
+
+def _connection():
+    conn = getattr(_local, "connection", None)
+    if conn is None:
+        conn = http.client.HTTPSConnection(PYPI_HOST, timeout=REQUEST_TIMEOUT)
+        _local.connection = conn
+    return conn
+
+def _drop_connection():
+    conn = getattr(_local, "connection", None)
+    if conn is not None:
+        conn.close()
+        _local.connection = None
+
+def _get_json(path, etag=None):
+    """
+    GET a JSON document from PyPI over this thread's persistent connection.
+
+    Args:
+        path (str): Request path on PYPI_HOST
+        etag (str, optional): ETag of a cached copy, sent as If-None-Match
+
+    Returns:
+        tuple: (decoded JSON body, ETag or None); the body is None when PyPI
+            answers 304 Not Modified to the etag given
+
+    Raises:
+        urllib.error.HTTPError: If PyPI answers with a non-200 status
+        http.client.HTTPException, OSError: If the request fails twice in a row
+        ValueError: If the response is not valid JSON
+
+    Note:
+        - A request that fails on a reused connection (e.g. the server closed
+          it while idle) is retried once on a fresh connection
+        - Responses are requested gzip-compressed
+    """
+    headers = {"Accept": "application/json", "Accept-Encoding": "gzip"}
+    if etag:
+        headers["If-None-Match"] = etag
+    for _ in range(MAX_REDIRECTS + 1):
+        for attempt in range(2):
+            conn = _connection()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                _drop_connection()
+                if attempt:
+                    raise
+        if response.getheader("Connection", "").lower() == "close":
+            _drop_connection()
+        url = f"https://{PYPI_HOST}{path}"
+        if response.status in (301, 302, 307, 308) and response.getheader("Location"):
+            path = urllib.parse.urlsplit(response.getheader("Location")).path
+            continue
+        if etag and response.status == 304:
+            return None, etag
+        if response.status != 200:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+        if response.getheader("Content-Encoding", "") == "gzip":
+            body = gzip.decompress(body)
+        return json.loads(body), response.getheader("ETag")
+    raise urllib.error.HTTPError(url, response.status, "Too many redirects", response.headers, None)
+
+def _fetch_versions(package_name, etag=None):
+    """
+    Download the release list of a package from the PyPI JSON API.
+
+    Args:
+        package_name (str): Name of the package
+        etag (str, optional): ETag of a cached release list to revalidate
+
+    Returns:
+        tuple: (list of (Version, version string) tuples of final releases
+            sorted ascending, ETag or None); the list is None when the release
+            list identified by etag is still current
+
+    Raises:
+        urllib.error.HTTPError: If the package is unknown to PyPI
+        http.client.HTTPException, OSError: If PyPI cannot be reached
+        ValueError: If the response is not valid JSON
+
+    Note:
+        - Mirrors the output of `pip3 index versions`: pre-releases, invalid
+          versions and releases whose files are all yanked are dropped
+    """
+    path = PYPI_JSON_PATH.format(urllib.parse.quote(package_name))
+    document, etag = _get_json(path, etag)
+    if document is None:
+        return None, etag
+    releases = document.get("releases", {})
+
+    parsed = []
+    for ver, files in releases.items():
+        if not files or all(f.get("yanked", False) for f in files):
+            continue
+        try:
+            version = V(ver)
+        except InvalidVersion:
+            continue
+        if not version.is_prerelease:
+            parsed.append((version, ver))
+    parsed.sort(key=operator.itemgetter(0))
+    return parsed, etag
+
+@functools.lru_cache(maxsize=4096)
+def _cached_versions(package_name):
+    cached = _read_disk_cache(package_name)
+    etag = None
+    if cached is not None:
+        versions, etag, fresh = cached
+        if fresh:
+            return tuple((V(ver), ver) for ver in versions)
+    try:
+        parsed, etag = _fetch_versions(package_name, etag)
+    except (http.client.HTTPException, OSError, ValueError) as e:
+        if cached is None:
+            raise
+        # Better an outdated release list than none; the entry stays expired, so the next run retries
+        log.warning("Could not revalidate PyPI versions for '%s', using the expired cache entry: %s", package_name, e)
+        return tuple((V(ver), ver) for ver in versions)
+    if parsed is None:
+        # PyPI confirmed the stale entry is current; store it again to restart its TTL
+        _write_disk_cache(package_name, versions, etag)
+        return tuple((V(ver), ver) for ver in versions)
+    _write_disk_cache(package_name, [ver for _, ver in parsed], etag)
+    return tuple(parsed)
+
+@functools.lru_cache(maxsize=4096)
+def _cached_index(package_name):
+    versions = _cached_versions(package_name)
+    return versions, tuple(version for version, _ in versions)
+
+def get_release_version_index(package_name):
+    """
+    Get the parsed release versions of a package together with a bisectable list.
+
+    Args:
+        package_name (str): Name of the package to query
+
+    Returns:
+        tuple: ((Version, version string) tuples sorted ascending, the Versions
+            alone in the same order); both empty if PyPI cannot be queried
+
+    Logs:
+        - ERROR: If PyPI cannot be queried
+
+    Note:
+        - The second item lets callers bisect with a plain Version (bisect's
+          key= argument needs Python 3.10); both are built once per package
+          and process, and must not be modified
+    """
+    try:
+        return _cached_index(package_name)
+    except (http.client.HTTPException, OSError, ValueError) as e:
+        log.error("Error getting PyPI versions for %s: %s", package_name, e)
+        return (), ()
+
+def get_parsed_release_versions(package_name):
+    """
+    Get the available release versions of a package from PyPI, already parsed.
+
+    Args:
+        package_name (str): Name of the package to query
+
+    Returns:
+        list: (Version, version string) tuples sorted ascending
+
+    Logs:
+        - ERROR: If PyPI cannot be queried
+
+    Note:
+        - Results are memoized per process and cached on disk for CACHE_TTL
+          seconds, so repeated lookups avoid the network entirely
+        - An expired entry is revalidated with the ETag PyPI sent for it, so an
+          unchanged release list costs a 304 instead of a full download; if
+          PyPI cannot be reached, the expired entry is used with a warning
+        - Each version string is parsed once per process
+        - Failed lookups are not cached and return an empty list
+    """
+    try:
+        return list(_cached_versions(package_name))
+    except (http.client.HTTPException, OSError, ValueError) as e:
+        log.error("Error getting PyPI versions for %s: %s", package_name, e)
+        return []
+
+def get_release_versions(package_name):
+    """
+    Get the available release versions of a package from PyPI.
+
+    Args:
+        package_name (str): Name of the package to query
+
+    Returns:
+        list: Sorted list of version strings (ascending order)
+    """
+    return [ver for _, ver in get_parsed_release_versions(package_name)]
+
+def prefetch_versions(package_names, max_workers=16):
+    """
+    Warm the version caches for several packages concurrently.
+
+    Args:
+        package_names (iterable): Names of the packages to fetch
+        max_workers (int): Maximum number of concurrent PyPI requests
+
+    Note:
+        - Populates both the in-process and the on-disk cache, so resolver
+          scripts started afterwards read their version lists from disk
+    """
+    names = list(package_names)
+    if not names:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(names))) as executor:
+        for _ in executor.map(get_release_versions, names):
+            pass
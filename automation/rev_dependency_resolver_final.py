@@ -1,17 +1,13 @@
-import subprocess
 import sys
 import json
 import logging
-from packaging.version import Version
-from packaging.requirements import Requirement
+from _vercache import V as _ver
+from packaging.version import InvalidVersion
+from packaging.utils import canonicalize_name
+from installed_packages import installed_distributions, get_reverse_dependencies, invalidate_cache
+from buffered_logging import BufferedFileHandler
 
-# Configure logging to append clearly to the same unified log file
-logging.basicConfig(
-    filename='resolve_dependencies.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+log = logging.getLogger(__name__)
 
 def get_installed_package_version(package_name):
     """
@@ -24,48 +20,18 @@ def get_installed_package_version(package_name):
         str or None: Version string if package is installed, None otherwise
         
     Logs:
-        - ERROR: If pip command fails
+        - ERROR: If the package is not installed
         
     Note:
-        - Uses pip3 show command to get package information
-        - Parses the output to extract the version number
+        - Looked up in installed_packages' map of the environment, the same
+          scan get_reverse_dependencies uses, instead of running pip3 show or
+          searching sys.path on every call
     """
-    try:
-        output = subprocess.check_output(["pip3", "show", package_name], text=True)
-        for line in output.strip().splitlines():
-            if line.startswith("Version:"):
-                return line.split(":")[1].strip()
-        return None
-    except subprocess.CalledProcessError:
-        logging.error(f"pip3 show failed for package: {package_name}")
-        return None
-
-def requirement_is_satisfied(requirement_str, current_version):
-    """
-    Check if a version requirement is satisfied by the current version.
-    
-    Args:
-        requirement_str (str): Requirement string (e.g., "package>=1.0.0")
-        current_version (str): Current version to check against
-        
-    Returns:
-        bool or None: True if satisfied, False if not, None if parsing error
-        
-    Logs:
-        - ERROR: If parsing the requirement or version fails
-        
-    Note:
-        - Uses packaging.requirements.Requirement to parse requirements
-        - Uses packaging.version.Version to parse versions
-        - Returns None if any parsing error occurs
-    """
-    try:
-        req = Requirement(requirement_str)
-        installed_version = Version(current_version)
-        return installed_version in req.specifier
-    except Exception as e:
-        logging.error(f"Error parsing requirement '{requirement_str}' with installed version '{current_version}': {e}")
+    dist = installed_distributions().get(canonicalize_name(package_name))
+    if dist is None:
+        log.error("Package not installed: %s", package_name)
         return None
+    return dist.version
 
 def main(package_name):
     """
@@ -81,83 +47,86 @@ def main(package_name):
         package_name (str): Name of the package to analyze
         
     Returns:
-        None: Results are printed
+        list or None: Names of dependent packages whose requirement is not satisfied,
+                      or None if the package is not installed
+        
+    Note:
+        - Dependents are read from installed_packages' reverse dependency map,
+          built in-process from installed metadata, instead of a
+          pipdeptree | grep | awk | tr | sort shell pipeline
     """
     current_version = get_installed_package_version(package_name)
     if current_version is None:
-        logging.error(f"Package '{package_name}' not found explicitly installed via pip.")
-        print("[]")  # explicitly empty output list to avoid parsing error
-        sys.exit(1)
+        log.error("Package '%s' not found explicitly installed via pip.", package_name)
+        return None
 
-    cmd = (
-        f'pipdeptree -p "{package_name}" --reverse 2>/dev/null'
-        f'| grep -iE "\\[requires: {package_name}" '
-        f'| awk \'{{print $2";"$4}}\' | tr -d \'[]\' | sort -u'
-    )
     try:
-        result = subprocess.check_output(cmd, shell=True, text=True)
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error running pipdeptree command: {e.output}")
-        print("[]")
-        sys.exit(1)
+        installed_version = _ver(current_version)
+    except InvalidVersion as e:
+        log.error("Invalid installed version '%s' for '%s': %s", current_version, package_name, e)
+        return []
 
     problem_packages_names_only = []
 
-    for line in result.strip().split("\n"):
-        if not line:
-            continue
-        dependent_package, required_spec = line.split(";", 1)
-
+    # The specifiers arrive parsed, so they are checked directly rather than
+    # formatted into requirement strings and parsed again
+    for dependent_name, dependent_version, specifier in get_reverse_dependencies(package_name):
         # No specifier explicitly required, so always satisfied explicitly.
-        if required_spec.strip() == package_name:
+        if not specifier:
             continue
 
-        requirement_str = f"{package_name}{required_spec}"
-
-        satisfied = requirement_is_satisfied(requirement_str, current_version)
-
-        if satisfied is None:
-            logging.warning(f"Could not parse requirement '{requirement_str}' for '{dependent_package}'. Skipping explicitly.")
-            continue
-
-        if not satisfied:
-            pkg_name_only = dependent_package.split("==")[0].strip()
-            logging.info(f"Reverse dependency issue identified: {dependent_package} requires '{requirement_str}' but {current_version} is installed.")
-            problem_packages_names_only.append(pkg_name_only)
+        if installed_version not in specifier and dependent_name not in problem_packages_names_only:
+            log.info("Reverse dependency issue identified: %s==%s requires '%s%s' but %s is installed.", dependent_name, dependent_version, package_name, specifier, current_version)
+            problem_packages_names_only.append(dependent_name)
 
     # Log the problematic reverse dependency packages explicitly.
-    logging.info(f"Reverse dependency issues identified for '{package_name}': {problem_packages_names_only}")
-
-    # Always explicitly output a well-formed JSON to stdout explicitly to be easily parsed by calling scripts
-    print(json.dumps(problem_packages_names_only))
+    log.info("Reverse dependency issues identified for '%s': %s", package_name, problem_packages_names_only)
+    return problem_packages_names_only
 
-# Explicitly ensure required functions exist:
-def get_installed_package_version(package_name):
-    try:
-        output = subprocess.check_output(["pip3", "show", package_name], text=True)
-        for line in output.strip().splitlines():
-            if line.startswith("Version:"):
-                return line.split(":", 1)[1].strip()
-    except subprocess.CalledProcessError as e:
-        logging.error(f"pip3 show command failed for {package_name}: {e}")
-        return None
-
-def requirement_is_satisfied(requirement_str, current_version):
-    try:
-        req = Requirement(requirement_str)
-        installed_version = Version(current_version)
-        return installed_version in req.specifier
-    except Exception as e:
-        logging.error(f"Error parsing requirement: {requirement_str}, version: {current_version}: {e}")
-        return None
+def serve():
+    """
+    Answer reverse dependency requests over stdin/stdout until stdin closes.
+    
+    Reads one package name per line and writes one JSON array per line, so a
+    caller can keep a single helper process alive instead of starting a new
+    interpreter for every package.
+    
+    Logs:
+        - ERROR: If resolving a package raises; an empty array is written instead
+    """
+    for line in sys.stdin:
+        package_name = line.strip()
+        if not package_name:
+            continue
+        # The caller may have installed packages since the last request
+        invalidate_cache()
+        try:
+            problem_packages_names_only = main(package_name)
+        except Exception as e:
+            log.exception("Unexpected error finding reverse dependencies for '%s': %s", package_name, e)
+            problem_packages_names_only = None
+        sys.stdout.write(json.dumps(problem_packages_names_only or []) + "\n")
+        sys.stdout.flush()
 
 if __name__ == "__main__":
+    # Configure logging to append clearly to the same unified log file
+    logging.basicConfig(
+        handlers=[BufferedFileHandler('resolve_dependencies.log')],
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    if sys.argv[1:] == ["--serve"]:
+        serve()
+        sys.exit(0)
     if len(sys.argv) != 2:
-        logging.error(f"Invalid invocation! Correct usage: python3 {sys.argv[0]} <package_name>")
+        log.error("Invalid invocation! Correct usage: python3 %s <package_name>", sys.argv[0])
         print("[]")
         sys.exit(1)
     package_name = sys.argv[1]
-    problem_packages_names_only = []
-    main(package_name)
-    #print(f"Problematic packages for '{package_name}': {problem_packages_names_only}") # Outputs explicitly
-    #print(json.dumps(problem_packages_names_only)) # Outputs JSON explicitly
+    problem_packages_names_only = main(package_name)
+    # Always explicitly output a well-formed JSON to stdout explicitly to be easily parsed by calling scripts
+    if problem_packages_names_only is None:
+        print("[]")  # explicitly empty output list to avoid parsing error
+        sys.exit(1)
+    print(json.dumps(problem_packages_names_only))
@@ -37,12 +37,12 @@ def run_subprocess(command, error_msg):
         logging.error(f"{error_msg}: {e}")
         raise
 
-def ensure_system_package(package_name):
+def ensure_system_packages(package_names):
     """
-    Check if a system package is installed and install it if not.
+    Check which system packages are missing and install them together.
     
     Args:
-        package_name (str): Name of the system package to check/install
+        package_names (list): Names of the system packages to check/install
         
     Returns:
         None
@@ -52,21 +52,46 @@ def ensure_system_package(package_name):
         
     Logs:
         - INFO: Package status (installed or not)
-        - INFO: When installing a package
+        - INFO: When installing packages
         - ERROR: If installation fails
+        
+    Note:
+        - Runs apt-get update and apt-get install once for all missing
+          packages instead of once per package
     """
-    logging.info(f"Checking if '{package_name}' is installed...")
-    if shutil.which(package_name):
-        logging.info(f"{package_name} already installed.")
+    missing = []
+    for package_name in package_names:
+        logging.info(f"Checking if '{package_name}' is installed...")
+        if shutil.which(package_name):
+            logging.info(f"{package_name} already installed.")
+        else:
+            missing.append(package_name)
+    if not missing:
         return
-    logging.info(f"{package_name} not found. Installing now.")
+    packages = " ".join(missing)
+    logging.info(f"{packages} not found. Installing now.")
     try:
-        run_subprocess(f"sudo apt-get update && sudo apt-get install -y {package_name}",
-                       f"Failed to install system package '{package_name}'")
+        run_subprocess(f"sudo apt-get update && sudo apt-get install -y {packages}",
+                       f"Failed to install system packages '{packages}'")
     except Exception as e:
-        logging.error(f"Unable to install system package '{package_name}': {e}")
+        logging.error(f"Unable to install system packages '{packages}': {e}")
         sys.exit(1)
 
+def ensure_system_package(package_name):
+    """
+    Check if a system package is installed and install it if not.
+    
+    Args:
+        package_name (str): Name of the system package to check/install
+        
+    Returns:
+        None
+        
+    Note:
+        - Single-package form of ensure_system_packages
+    """
+    ensure_system_packages([package_name])
+
 def create_virtualenv(env_name):
     """
     Create a Python virtual environment.
@@ -96,7 +121,7 @@ def run_command_in_venv(command, env_path, step_desc):
     Run a command within a Python virtual environment.
     
     Args:
-        command (str): Command to run in the virtual environment
+        command (list): Program and arguments to run (e.g., ["pip", "install", "pyyaml"])
         env_path (str): Path to the virtual environment
         step_desc (str): Description of the step being performed
         
@@ -109,12 +134,19 @@ def run_command_in_venv(command, env_path, step_desc):
     Logs:
         - INFO: When starting and completing a step
         - ERROR: If step execution fails
+        
+    Note:
+        - The program is taken from the environment's bin directory when it
+          exists there (python, pip) and run directly, without a shell
+        - VIRTUAL_ENV and PATH are set as `source bin/activate` would set them,
+          so scripts started this way also find the environment's python and pip
     """
-    activate_env = f"source {env_path}/bin/activate"
-    full_command = f"{activate_env} && {command}"
+    bin_dir = os.path.join(env_path, "bin")
+    program = shutil.which(command[0], path=bin_dir) or command[0]
+    env = dict(os.environ, VIRTUAL_ENV=env_path, PATH=bin_dir + os.pathsep + os.environ.get("PATH", ""))
     logging.info(f"Starting step: {step_desc}")
     try:
-        subprocess.check_call(full_command, shell=True, executable='/bin/bash')
+        subprocess.check_call([program, *command[1:]], env=env)
         logging.info(f"Completed successfully: {step_desc}")
     except subprocess.CalledProcessError as e:
         logging.error(f"Failed during '{step_desc}': {e}")
@@ -150,7 +182,7 @@ def main(requirement_file, yml_file):
     logging.info("--- Starting environment setup ---")
 
     # Step 0: Ensure python3-venv is installed
-    ensure_system_package('python3-venv')
+    ensure_system_packages(['python3-venv'])
 
     # Create virtual environment explicitly
     try:
@@ -165,7 +197,7 @@ def main(requirement_file, yml_file):
     try:
         packages_to_install = 'pipdeptree pip-tools pyyaml pip-autoremove'
         run_command_in_venv(
-            f"pip install {packages_to_install}",
+            ["pip", "install", *packages_to_install.split()],
             env_path,
             "Installing required python packages into virtual environment"
         )
@@ -178,7 +210,7 @@ def main(requirement_file, yml_file):
     # Step 2(a): Now safely run extract_install_pip_apt_from_yml.py
     try:
         run_command_in_venv(
-            f"python extract_install_pip_apt_from_yml.py {yml_file}",
+            ["python", "extract_install_pip_apt_from_yml.py", yml_file],
             env_path,
             "YML Pip & Apt package extraction and installation"
         )
@@ -191,7 +223,7 @@ def main(requirement_file, yml_file):
     # Step 2(b): Finally, run install_packages_from_requirement_files.sh
     try:
         run_command_in_venv(
-            f"bash install_packages_from_requirement_files.sh {requirement_file}",
+            ["bash", "install_packages_from_requirement_files.sh", requirement_file],
             env_path,
             "Requirements.txt package installation"
         )
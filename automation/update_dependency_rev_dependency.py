@@ -1,17 +1,16 @@
+import os
 import subprocess
 import sys
 import logging
-import ast
 import json
+from concurrent.futures import ThreadPoolExecutor
 from packaging.version import Version, InvalidVersion
-
-# Configure logging to write to a file with timestamp, level, and message
-logging.basicConfig(
-    filename='resolve_dependencies.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+from packaging.utils import canonicalize_name
+from installed_packages import installed_distributions, invalidate_cache
+import dependency_resolver_final
+import rev_dependency_resolver_final
+import get_version_for_rev_dependendencies
+from buffered_logging import BufferedFileHandler
 
 def run_command(cmd):
     """
@@ -46,19 +45,41 @@ def get_installed_version(package_name):
         str or None: Version string if package is installed, None otherwise
         
     Note:
-        Uses pip3 show to get package information
+        - Looked up in installed_packages' map of the environment, which is
+          built with one scan of the installed metadata and reused until
+          install_package invalidates it; no pip3 show or per-call scan
     """
-    try:
-        output = subprocess.check_output(["pip3", "show", package_name], text=True)
-        for line in output.strip().splitlines():
-            if line.startswith("Version:"):
-                return line.split(":", 1)[1].strip()
-    except subprocess.CalledProcessError:
-        return None
+    dist = installed_distributions().get(canonicalize_name(package_name))
+    return dist.version if dist is not None else None
+
+def as_package_list(result, source):
+    """
+    Check that a resolver returned a list of package strings.
+    
+    Args:
+        result: Value returned by the resolver's main()
+        source (str): Resolver name, for the log message
+        
+    Returns:
+        list: The result, or an empty list if it is not a list of strings
+        
+    Logs:
+        - ERROR: If the result has an unexpected shape
+        
+    Note:
+        - Stands in for the JSON decoding of the old stdout handshake, so a
+          malformed result is logged and skipped instead of failing main
+    """
+    if result is None:
+        return []
+    if isinstance(result, list) and all(isinstance(item, str) for item in result):
+        return result
+    logging.error(f"Unexpected result from {source}: {result!r}")
+    return []
 
 def parse_dependency_issues(package):
     """
-    Parse dependency issues for a package using dependency_resolver_final.py.
+    Get dependency issues for a package from dependency_resolver_final.
     
     Args:
         package (str): Name of the package to analyze
@@ -67,25 +88,22 @@ def parse_dependency_issues(package):
         list: List of dependency issues found
         
     Logs:
-        - ERROR: If parsing fails
+        - ERROR: If resolving fails
         
     Note:
-        Expects dependency_resolver_final.py to output a list in string format
+        Calls dependency_resolver_final.main in-process instead of starting
+        a new interpreter and parsing its printed list
     """
-    cmd = f'python3 dependency_resolver_final.py "{package}"'
-    output = run_command(cmd)
-    if output:
-        try:
-            issues_list = ast.literal_eval(output.strip())
-            if isinstance(issues_list, list):
-                return issues_list
-        except (ValueError, SyntaxError) as e:
-            logging.error(f"Error parsing dependency issues for {package}: {e}")
-    return []
+    try:
+        result = dependency_resolver_final.main(package)
+    except Exception as e:
+        logging.error(f"Error resolving dependency issues for {package}: {e}")
+        return []
+    return as_package_list(result, "dependency_resolver_final")
 
 def parse_reverse_dependencies(package):
     """
-    Parse reverse dependencies for a package using rev_dependency_resolver_final.py.
+    Get reverse dependencies for a package from rev_dependency_resolver_final.
     
     Args:
         package (str): Name of the package to analyze
@@ -94,21 +112,18 @@ def parse_reverse_dependencies(package):
         list: List of reverse dependencies found
         
     Logs:
-        - ERROR: If parsing fails
+        - ERROR: If resolving fails
         
     Note:
-        Expects rev_dependency_resolver_final.py to output a list in string format
+        Calls rev_dependency_resolver_final.main in-process instead of starting
+        a new interpreter and parsing its printed list
     """
-    cmd = f'python3 rev_dependency_resolver_final.py "{package}"'
-    output = run_command(cmd)
-    if output:
-        try:
-            rev_deps_list = ast.literal_eval(output.strip())
-            if isinstance(rev_deps_list, list):
-                return rev_deps_list
-        except (ValueError, SyntaxError) as e:
-            logging.error(f"Error parsing reverse dependencies for {package}: {e}")
-    return []
+    try:
+        result = rev_dependency_resolver_final.main(package)
+    except Exception as e:
+        logging.error(f"Error resolving reverse dependencies for {package}: {e}")
+        return []
+    return as_package_list(result, "rev_dependency_resolver_final")
 
 def get_trail_version(package, current_version):
     """
@@ -124,11 +139,43 @@ def get_trail_version(package, current_version):
     Returns:
         str or None: Trail version if found, None otherwise
         
+    Logs:
+        - ERROR: If the lookup fails
+        
     Note:
-        Uses get_version_for_rev_dependendencies.py with --trail flag
+        Calls get_version_for_rev_dependendencies.main with the --trail flag
+        in-process; PyPI version lists stay cached across calls
     """
-    cmd = f'python3 get_version_for_rev_dependendencies.py "{package}" "{current_version}" --trail'
-    return run_command(cmd)
+    try:
+        selected_versions = get_version_for_rev_dependendencies.main(package, current_version, ['--trail'])
+    except Exception as e:
+        logging.error(f"Error finding trail version for {package}: {e}")
+        return None
+    return (selected_versions or {}).get('trail')
+
+def get_rev_dep_trail_spec(rev_dep):
+    """
+    Pick the trail version a reverse dependency should be upgraded to.
+    
+    Args:
+        rev_dep (str): Name of the reverse dependency
+        
+    Returns:
+        str or None: Package specification (e.g., "package==1.0.0"), or None if
+                     the package is not installed or no trail version exists
+        
+    Logs:
+        - WARNING: If the package is not installed or no trail version is found
+    """
+    current_version = get_installed_version(rev_dep)
+    if not current_version:
+        logging.warning(f"Reverse dependency {rev_dep} not installed; skipping.")
+        return None
+    trail_version = get_trail_version(rev_dep, current_version)
+    if not trail_version:
+        logging.warning(f"No trail version found for {rev_dep}")
+        return None
+    return f"{rev_dep}=={trail_version}"
 
 def install_package(package_spec):
     """
@@ -145,16 +192,51 @@ def install_package(package_spec):
         - ERROR: Installation failure
         
     Note:
-        Uses pip3 install with --no-deps to avoid dependency conflicts
+        - Uses pip3 install with --no-deps to avoid dependency conflicts
+        - Drops the cached map of installed packages afterwards, since even a
+          failed install may have removed the previous version
     """
     cmd = f'pip3 install "{package_spec}" --no-deps'
-    if run_command(cmd) is not None:
+    installed = run_command(cmd) is not None
+    invalidate_cache()
+    if installed:
         logging.info(f"Installed: {package_spec}")
         return True
     else:
         logging.error(f"Installation failed for: {package_spec}")
         return False
 
+def install_packages(package_specs):
+    """
+    Install several Python packages with specific versions in one pip3 call.
+    
+    Args:
+        package_specs (list): Package specifications (e.g., ["package==1.0.0"])
+        
+    Returns:
+        set: The specifications that were installed
+        
+    Logs:
+        - INFO: Installation success
+        - ERROR: Installation failure
+        
+    Note:
+        - Uses a single pip3 install --no-deps for all specifications, paying
+          pip's startup once per iteration instead of once per package
+        - If that call fails, retries the specifications one by one through
+          install_package to find which failed
+    """
+    if not package_specs:
+        return set()
+    cmd = "pip3 install " + " ".join(f'"{spec}"' for spec in package_specs) + " --no-deps"
+    installed = run_command(cmd) is not None
+    invalidate_cache()
+    if installed:
+        logging.info(f"Installed: {', '.join(package_specs)}")
+        return set(package_specs)
+    logging.error("Batch installation failed; retrying packages one by one.")
+    return {spec for spec in package_specs if install_package(spec)}
+
 def main(initial_packages):
     """
     Main function to resolve and update package dependencies.
@@ -176,10 +258,20 @@ def main(initial_packages):
         - INFO: Iteration progress
         - INFO: Package analysis and upgrades
         - WARNING: Missing packages or versions
+        
+    Note:
+        - The per-package analyses of an iteration are independent and mostly
+          wait on PyPI and pipdeptree, so they run in a thread pool of
+          MAX_WORKERS threads
+        - All upgrades of an iteration are installed with one pip3 call
+        - Re-reads the requirement files list of dependency_resolver_final
+          once per run
     """
+    dependency_resolver_final.invalidate_requirement_files()
     upgrade_history = {}
     iteration = 0
     MAX_ITERATIONS = 10
+    MAX_WORKERS = 16
 
     logging.info("=== Starting dependency resolution loop ===")
 
@@ -191,26 +283,20 @@ def main(initial_packages):
         dependency_issue_packages = set()
         rev_deps_trail_packages = set()
 
-        # Step 1: Resolve direct dependency issues explicitly only for the relevant packages
-        for package in packages_to_check:
-            logging.info(f"Analyzing direct dependencies for package: {package}")
-            dep_issues = parse_dependency_issues(package)
-            dependency_issue_packages.update(dep_issues)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # Step 1: Resolve direct dependency issues explicitly only for the relevant packages
+            logging.info(f"Analyzing direct dependencies for packages: {sorted(packages_to_check)}")
+            for dep_issues in executor.map(parse_dependency_issues, packages_to_check):
+                dependency_issue_packages.update(dep_issues)
 
-        # Step 2: Resolve reverse dependency explicitly only for the relevant packages
-        for package in packages_to_check:
-            logging.info(f"Analyzing reverse dependencies for package: {package}")
-            rev_deps = parse_reverse_dependencies(package)
-            for rev_dep in rev_deps:
-                current_version = get_installed_version(rev_dep)
-                if not current_version:
-                    logging.warning(f"Reverse dependency {rev_dep} not installed; skipping.")
-                    continue
-                trail_version = get_trail_version(rev_dep, current_version)
-                if trail_version:
-                    rev_deps_trail_packages.add(f"{rev_dep}=={trail_version}")
-                else:
-                    logging.warning(f"No trail version found for {rev_dep}")
+            # Step 2: Resolve reverse dependency explicitly only for the relevant packages
+            logging.info(f"Analyzing reverse dependencies for packages: {sorted(packages_to_check)}")
+            rev_deps = {}
+            for package_rev_deps in executor.map(parse_reverse_dependencies, packages_to_check):
+                rev_deps.update(dict.fromkeys(package_rev_deps))
+            for trail_spec in executor.map(get_rev_dep_trail_spec, rev_deps):
+                if trail_spec:
+                    rev_deps_trail_packages.add(trail_spec)
 
         # Combine both dependency types for installation
         combined_list_to_upgrade = dependency_issue_packages | rev_deps_trail_packages
@@ -223,21 +309,25 @@ def main(initial_packages):
         # Next iteration—we'll explicitly only check packages we changed/upgraded during this iteration
         packages_to_check_next_iteration = set()
 
+        # (package name, specification, version installed before this iteration)
+        upgrades = []
         for pkg_spec in combined_list_to_upgrade:
-            if "==" in pkg_spec:
-                pkg_name, pkg_version = pkg_spec.split("==")
-            else:
-                pkg_name = pkg_spec.strip()
-                current_version = get_installed_version(pkg_name) or '0.0.0'
-                pkg_version = get_trail_version(pkg_name, current_version)
+            pkg_name = pkg_spec.split("==")[0].strip()
+            # Looked up once; it is both the trail starting point and the previous version
+            installed_version = get_installed_version(pkg_name)
+            if "==" not in pkg_spec:
+                pkg_version = get_trail_version(pkg_name, installed_version or '0.0.0')
                 if not pkg_version:
                     logging.warning(f"Skipping {pkg_name}: cannot determine required version.")
                     continue
                 pkg_spec = f"{pkg_name}=={pkg_version}"
 
-            previous_version = get_installed_version(pkg_name) or "Not Installed"
+            upgrades.append((pkg_name, pkg_spec, installed_version or "Not Installed"))
+
+        installed_specs = install_packages([pkg_spec for _, pkg_spec, _ in upgrades])
 
-            if install_package(pkg_spec):
+        for pkg_name, pkg_spec, previous_version in upgrades:
+            if pkg_spec in installed_specs:
                 new_version = get_installed_version(pkg_name) or "Installation failed"
                 logging.info(f"{pkg_name}: {previous_version} → {new_version}")
 
@@ -287,6 +377,13 @@ if __name__ == "__main__":
         - ERROR: If arguments are invalid
         - ERROR: If an unexpected error occurs
     """
+    # Configure logging to write to a file with timestamp, level, and message
+    logging.basicConfig(
+        handlers=[BufferedFileHandler('resolve_dependencies.log')],
+        level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
     if len(sys.argv) != 2:
         print(f"\nUsage: python3 {sys.argv[0]} '<package1>,<package2>,...'\n")
         sys.exit(1)
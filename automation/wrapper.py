@@ -4,7 +4,7 @@ import subprocess
 import logging
 import json
 import yaml
-from packaging.version import Version
+from _vercache import V
 
 # Configure logging 
 logging.basicConfig(
@@ -85,7 +85,7 @@ if not skip_max_version_check:
                 max_version = max_version_info[0]
 
                 # Compare the provided version and max version explicitly
-                if Version(provided_version) < Version(max_version_info[0]):
+                if V(provided_version) < V(max_version_info[0]):
                     logging.info(f"Using newer max version for {pkg}: {provided_version}→{max_version_info[0]}")
                     # update upgraded_versions and package_specs accordingly clearly
                     upgraded_versions[idx] = max_version_info[0]
@@ -266,7 +266,7 @@ try:
                     logging.info(f"Found {pkg_name} in {req_file} with version {current_version}")
                     
                     # Compare versions
-                    if current_version and Version(current_version) < Version(versions['upgraded_version']):
+                    if current_version and V(current_version) < V(versions['upgraded_version']):
                         # Update the package version in the file
                         logging.info(f"Updating {pkg_name} in {req_file} from {current_version} to {versions['upgraded_version']}")
                         update_result = subprocess.run(
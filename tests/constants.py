@@ -8,3 +8,4 @@ PACKAGES_PATH = os.path.join(TEST_DATA_PATH, "packages")
 PACKAGES_RELATIVE_PATH = os.path.relpath(
     PACKAGES_PATH, os.path.commonpath([os.getcwd(), PACKAGES_PATH])
 )
+AUTOMATION_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "automation")
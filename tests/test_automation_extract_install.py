@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import importlib
+import logging
+
+import pytest
+
+from .constants import AUTOMATION_PATH
+
+
+@pytest.fixture
+def extract_install(monkeypatch):
+    monkeypatch.syspath_prepend(AUTOMATION_PATH)
+    return importlib.import_module("extract_install_pip_apt_from_yml")
+
+
+def write_playbook(tmp_path, text, requirements=None):
+    if requirements is not None:
+        (tmp_path / "requirements.txt").write_text(requirements)
+    playbook = tmp_path / "playbook.yml"
+    playbook.write_text(text)
+    return str(playbook)
+
+
+def names(packages):
+    return [pkg.name for pkg in packages]
+
+
+@pytest.mark.parametrize(
+    ("requirement", "expected"),
+    (
+        pytest.param("foo", ("foo", ""), id="bare"),
+        pytest.param(
+            "Foo_Bar.baz >= 1.0", ("foo-bar-baz", ">=1.0"), id="normalized"
+        ),
+        pytest.param("foo[extra]==1.0", ("foo", "[extra]==1.0"), id="extras"),
+        pytest.param("-r other.txt", ("-r other.txt", ""), id="pip option"),
+    ),
+)
+def test_pip_package_key(extract_install, requirement, expected):
+    assert extract_install._pip_package_key(requirement) == expected
+
+
+def test_extract_packages_lists_each_pip_package_once(extract_install, tmp_path):
+    playbook = write_playbook(
+        tmp_path,
+        "- pip:\n"
+        "    name:\n"
+        "      - requests\n"
+        "      - Foo_Bar\n"
+        "      - six==1.16.0\n"
+        f"    requirements: {tmp_path / 'requirements.txt'}\n",
+        requirements="foo-bar==2.0\nrequests\nsix == 1.16.0\nSIX\n",
+    )
+
+    pip_packages, apt_packages = extract_install.extract_packages(playbook)
+
+    assert names(pip_packages) == ["requests", "foo-bar==2.0", "six==1.16.0"]
+    assert apt_packages == []
+
+
+def test_extract_packages_keeps_first_of_conflicting_pins(
+    extract_install, tmp_path, caplog
+):
+    playbook = write_playbook(
+        tmp_path,
+        "- pip:\n"
+        "    name: [foo, foo==1.0, Foo==2.0]\n"
+        "- apt:\n"
+        "    name: [curl=7.0, curl, curl=8.0]\n",
+    )
+
+    with caplog.at_level(logging.WARNING):
+        pip_packages, apt_packages = extract_install.extract_packages(playbook)
+
+    assert names(pip_packages) == ["foo==1.0"]
+    assert names(apt_packages) == ["curl=7.0"]
+    assert [record.getMessage() for record in caplog.records] == [
+        "Conflicting entries for package 'foo': "
+        "keeping 'foo==1.0', ignoring 'Foo==2.0'",
+        "Conflicting entries for package 'curl': "
+        "keeping 'curl=7.0', ignoring 'curl=8.0'",
+    ]
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import importlib
+import logging
+
+import pytest
+from packaging.version import Version
+
+from .constants import AUTOMATION_PATH
+
+
+@pytest.fixture
+def max_versions(monkeypatch):
+    monkeypatch.syspath_prepend(AUTOMATION_PATH)
+    monkeypatch.delenv("PIPTOOLS_NO_CONFIG_CACHE", raising=False)
+    module = importlib.import_module("get_normal_max_versions")
+    monkeypatch.setattr(module, "_requirements_cache", {})
+    monkeypatch.setattr(module, "_package_index", {"key": None, "index": None})
+    return module
+
+
+@pytest.fixture
+def requirements_file(tmp_path):
+    def write(text, name="requirements.txt"):
+        path = tmp_path / name
+        path.write_text(text)
+        return str(path)
+
+    return write
+
+
+@pytest.mark.parametrize(
+    ("config", "expected"),
+    (
+        pytest.param(
+            "requirement_files:\n"
+            "  - a.txt  # first\n"
+            "  - b/c.in\n"
+            "yml_files:\n"
+            "  - m.yml\n",
+            ["a.txt", "b/c.in"],
+            id="block list",
+        ),
+        pytest.param(
+            "requirement_files: [a.txt, b.txt]\n", ["a.txt", "b.txt"], id="flow list"
+        ),
+        pytest.param(
+            "base: &files\n  - a.txt\nrequirement_files: *files\n",
+            ["a.txt"],
+            id="alias",
+        ),
+        pytest.param("yml_files:\n  - m.yml\n", [], id="no requirement files"),
+    ),
+)
+def test_load_requirement_files(max_versions, tmp_path, config, expected):
+    config_file = tmp_path / "files_config.yml"
+    config_file.write_text(config)
+
+    assert max_versions.load_requirement_files(str(config_file)) == expected
+
+
+def test_load_requirement_files_of_missing_config_is_none(max_versions, tmp_path):
+    assert max_versions.load_requirement_files(str(tmp_path / "missing.yml")) is None
+
+
+def test_load_requirement_files_rereads_a_changed_config(max_versions, tmp_path):
+    config_file = tmp_path / "files_config.yml"
+    config_file.write_text("requirement_files:\n  - a.txt\n")
+    assert max_versions.load_requirement_files(str(config_file)) == ["a.txt"]
+    assert (tmp_path / "files_config.yml.pkl").exists()
+
+    config_file.write_text("requirement_files:\n  - a.txt\n  - b.txt\n")
+
+    assert max_versions.load_requirement_files(str(config_file)) == ["a.txt", "b.txt"]
+
+
+def test_load_requirement_files_without_config_cache(
+    max_versions, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("PIPTOOLS_NO_CONFIG_CACHE", "1")
+    config_file = tmp_path / "files_config.yml"
+    config_file.write_text("requirement_files:\n  - a.txt\n")
+
+    assert max_versions.load_requirement_files(str(config_file)) == ["a.txt"]
+    assert not (tmp_path / "files_config.yml.pkl").exists()
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    (
+        pytest.param(b"six==1.16.0", (b"", b"six", b"1.16.0", b""), id="plain"),
+        pytest.param(
+            b"  SIX == 1.16.0 ; python_version < '3' # pinned",
+            (b"  ", b"SIX", b"1.16.0", b" ; python_version < '3' # pinned"),
+            id="indent, marker and comment",
+        ),
+        pytest.param(b"Foo.Bar==2.0", (b"", b"Foo.Bar", b"2.0", b""), id="dotted name"),
+        pytest.param(b"sixty==1.0", None, id="longer name"),
+        pytest.param(b"# six==1.0", None, id="commented out"),
+        pytest.param(b"six>=1.0", None, id="not a pin"),
+    ),
+)
+def test_pin_line_pattern(max_versions, line, expected):
+    match = max_versions._pin_line_pattern("six", "foo.bar").search(line)
+
+    assert (match and match.groups()) == expected
+
+
+def test_pin_line_pattern_is_compiled_once(max_versions):
+    pattern = max_versions._pin_line_pattern("six")
+
+    assert max_versions._pin_line_pattern("six") is pattern
+
+
+def test_find_one(max_versions, requirements_file):
+    path = requirements_file("Six==1.15.0\nclick==8.0\n# six==0.1\nsix==1.16.0\n")
+
+    assert max_versions.find_one(path, "six") == "1.16.0"
+    assert max_versions.find_one(path, "CLICK") == "8.0"
+    assert max_versions.find_one(path, "requests") is None
+
+
+def test_find_one_in_empty_or_missing_file_is_none(
+    max_versions, requirements_file, tmp_path
+):
+    assert max_versions.find_one(requirements_file(""), "six") is None
+    assert max_versions.find_one(str(tmp_path / "missing.txt"), "six") is None
+
+
+def test_build_package_index(max_versions, requirements_file, caplog):
+    first = requirements_file("Six==1.15.0\nclick==8.0\n", name="first.txt")
+    second = requirements_file("six==1.16.0\nbad==1.0.*\n", name="second.txt")
+
+    with caplog.at_level(logging.ERROR):
+        index = max_versions.build_package_index([first, second])
+
+    assert index == {
+        "six": [
+            (Version("1.15.0"), "1.15.0", first),
+            (Version("1.16.0"), "1.16.0", second),
+        ],
+        "click": [(Version("8.0"), "8.0", first)],
+    }
+    assert "Invalid version format for bad" in caplog.text
+
+
+def test_build_package_index_is_rebuilt_when_a_file_changes(
+    max_versions, requirements_file
+):
+    path = requirements_file("six==1.15.0\n")
+    index = max_versions.build_package_index([path])
+    assert max_versions.build_package_index([path]) is index
+
+    requirements_file("six==1.16.0\nclick==8.0\n")
+
+    assert max_versions.build_package_index([path]) == {
+        "six": [(Version("1.16.0"), "1.16.0", path)],
+        "click": [(Version("8.0"), "8.0", path)],
+    }
+
+
+def test_update_many_rewrites_pins(max_versions, requirements_file, tmp_path):
+    path = requirements_file(
+        "# pinned\n"
+        "  Six == 1.15.0 ; python_version >= '3' # keep\n"
+        "click==8.0\n"
+        "requests>=2\n"
+    )
+    before = {"six": "1.15.0", "click": "8.0"}
+    assert max_versions.read_requirements_lower(path) == before
+
+    updated = max_versions.update_many(path, {"six": "1.16.0", "Click": "8.1"})
+
+    assert updated == {"six", "Click"}
+    assert (tmp_path / "requirements.txt").read_text() == (
+        "# pinned\n"
+        "  Six==1.16.0 ; python_version >= '3' # keep\n"
+        "click==8.1\n"
+        "requests>=2\n"
+    )
+    after = {"six": "1.16.0", "click": "8.1"}
+    assert max_versions.read_requirements_lower(path) == after
+    assert not (tmp_path / "requirements.txt.tmp").exists()
+
+
+def test_update_many_reports_missing_packages(
+    max_versions, requirements_file, tmp_path, caplog
+):
+    path = requirements_file("six==1.15.0\nrequests>=2\n")
+
+    with caplog.at_level(logging.WARNING):
+        updated = max_versions.update_many(path, {"six": "1.16.0", "requests": "2.0"})
+
+    assert updated == {"six"}
+    assert (tmp_path / "requirements.txt").read_text() == "six==1.16.0\nrequests>=2\n"
+    assert "requests not found explicitly in" in caplog.text
+
+
+def test_update_many_leaves_file_alone_without_matches(
+    max_versions, requirements_file, tmp_path
+):
+    path = requirements_file("six==1.15.0\n")
+    before = (tmp_path / "requirements.txt").stat().st_mtime_ns
+
+    assert max_versions.update_many(path, {"click": "8.1"}) == set()
+    assert max_versions.update_many(path, {}) == set()
+    assert (tmp_path / "requirements.txt").stat().st_mtime_ns == before
+
+
+def test_update_many_of_missing_file_is_none(max_versions, tmp_path):
+    path = str(tmp_path / "missing.txt")
+
+    assert max_versions.update_many(path, {"six": "1.0"}) is None
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import importlib
+import json
+import subprocess
+import sys
+
+import pytest
+
+from .constants import AUTOMATION_PATH
+
+
+@pytest.fixture
+def problematic(monkeypatch):
+    monkeypatch.syspath_prepend(AUTOMATION_PATH)
+    importlib.import_module("installed_packages").invalidate_cache()
+    return importlib.import_module("get_problematic_dependent_rev_dependendent_pkg")
+
+
+def pipdeptree_direct_dependencies(package_name):
+    pytest.importorskip("pipdeptree")
+    output = subprocess.check_output(
+        [sys.executable, "-m", "pipdeptree", "--json", "-p", package_name], text=True
+    )
+    (entry,) = (
+        entry for entry in json.loads(output) if entry["package"]["key"] == package_name
+    )
+    return [
+        (dep["package_name"], dep["required_version"], dep["installed_version"])
+        for dep in entry["dependencies"]
+    ]
+
+
+def test_package_dependencies_match_pipdeptree(problematic):
+    expected = pipdeptree_direct_dependencies("pip-tools")
+
+    assert problematic.get_package_dependencies("pip-tools") == expected
+    assert problematic.get_package_dependencies("Pip_Tools") == expected
+
+
+def test_package_dependencies_leave_out_transitive_ones(problematic):
+    # build depends on packaging, which pip-tools only requires indirectly
+    dependencies = problematic.get_package_dependencies("pip-tools")
+    names = [name for name, _, _ in dependencies]
+
+    assert len(names) == len(set(names))
+    assert "build" in names
+    assert "packaging" not in names
+
+
+def test_package_dependencies_of_missing_package_are_none(problematic):
+    assert problematic.get_package_dependencies("surely-not-installed-pkg") is None
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import importlib
+import json
+import subprocess
+import sys
+
+import pytest
+from packaging.specifiers import SpecifierSet
+
+from .constants import AUTOMATION_PATH
+
+
+@pytest.fixture
+def installed_packages(monkeypatch):
+    monkeypatch.syspath_prepend(AUTOMATION_PATH)
+    module = importlib.import_module("installed_packages")
+    module.invalidate_cache()
+    yield module
+    module.invalidate_cache()
+
+
+def pipdeptree_json(*args):
+    pytest.importorskip("pipdeptree")
+    output = subprocess.check_output(
+        [sys.executable, "-m", "pipdeptree", "--json", *args], text=True
+    )
+    return json.loads(output)
+
+
+def test_dependency_tree_matches_pipdeptree(installed_packages):
+    assert installed_packages.dependency_tree() == pipdeptree_json()
+
+
+def test_dependency_tree_for_one_package_matches_pipdeptree(installed_packages):
+    assert installed_packages.dependency_tree("pytest") == pipdeptree_json(
+        "-p", "pytest"
+    )
+
+
+def test_dependency_tree_for_missing_package_is_empty(installed_packages):
+    assert installed_packages.dependency_tree("surely-not-installed-pkg") == []
+
+
+@pytest.mark.parametrize(
+    ("specifier", "expected"),
+    (
+        pytest.param("", "", id="empty"),
+        pytest.param("<4,>=2.5", ">=2.5,<4", id="two clauses"),
+        pytest.param(
+            "!=3.0.37,<3.1.0,>=3.0.30",
+            ">=3.0.30,!=3.0.37,<3.1.0",
+            id="exclusion between bounds",
+        ),
+        pytest.param("==1.*,>=0.9", ">=0.9,==1.*", id="wildcard"),
+        pytest.param("===foo,>=1", ">=1,===foo", id="arbitrary equality"),
+    ),
+)
+def test_format_specifier_orders_clauses_by_version(
+    installed_packages, specifier, expected
+):
+    assert installed_packages.format_specifier(SpecifierSet(specifier)) == expected
+
+
+def test_reverse_dependencies_list_dependents_with_their_specifier(
+    installed_packages,
+):
+    dependents = {
+        name.lower(): specifier
+        for name, _, specifier in installed_packages.get_reverse_dependencies("pluggy")
+    }
+
+    assert "pytest" in dependents
+    assert isinstance(dependents["pytest"], SpecifierSet)
+
+
+def test_invalidate_cache_rescans_the_environment(installed_packages):
+    first = installed_packages.installed_distributions()
+
+    assert installed_packages.installed_distributions() is first
+    installed_packages.invalidate_cache()
+    assert installed_packages.installed_distributions() is not first
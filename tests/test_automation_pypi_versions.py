@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import gzip
+import importlib
+import json
+import os
+
+import pytest
+
+from .constants import AUTOMATION_PATH
+
+
+class FakeResponse:
+    def __init__(self, status, body=b"", headers=None, reason="OK"):
+        self.status = status
+        self.reason = reason
+        self.headers = headers or {}
+        self._body = body
+
+    def read(self):
+        return self._body
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+class FakeConnection:
+    """Stands in for http.client.HTTPSConnection, answering from a queue of responses."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def request(self, method, path, headers=None):
+        self.requests.append((method, path, dict(headers or {})))
+
+    def getresponse(self):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def close(self):
+        pass
+
+
+def release_document(releases):
+    return json.dumps({"releases": releases}).encode()
+
+
+def release_file(yanked=False):
+    return {"filename": "pkg.tar.gz", "yanked": yanked}
+
+
+@pytest.fixture
+def pypi_versions(monkeypatch, tmp_path):
+    monkeypatch.syspath_prepend(AUTOMATION_PATH)
+    module = importlib.import_module("pypi_versions")
+    monkeypatch.setattr(module, "CACHE_DIR", str(tmp_path))
+    module._cached_versions.cache_clear()
+    module._cached_index.cache_clear()
+    module._local.connection = None
+    yield module
+    module._cached_versions.cache_clear()
+    module._cached_index.cache_clear()
+    module._local.connection = None
+
+
+@pytest.fixture
+def fake_pypi(monkeypatch, pypi_versions):
+    """Queue responses for the next PyPI requests; returns the fake connection."""
+
+    def make(*responses):
+        connection = FakeConnection(list(responses))
+        monkeypatch.setattr(
+            pypi_versions.http.client,
+            "HTTPSConnection",
+            lambda host, timeout=None: connection,
+        )
+        return connection
+
+    return make
+
+
+def expire(pypi_versions, package_name):
+    os.utime(pypi_versions._cache_path(package_name), (0, 0))
+
+
+def test_release_list_drops_yanked_prerelease_and_invalid_versions(
+    pypi_versions, fake_pypi
+):
+    fake_pypi(
+        FakeResponse(
+            200,
+            release_document(
+                {
+                    "1.10": [release_file()],
+                    "1.0": [release_file()],
+                    "1.5": [release_file(yanked=True)],
+                    "1.6": [release_file(yanked=True), release_file()],
+                    "2.0rc1": [release_file()],
+                    "2.0": [],
+                    "not-a-version": [release_file()],
+                }
+            ),
+        )
+    )
+
+    assert pypi_versions.get_release_versions("pkg") == ["1.0", "1.6", "1.10"]
+
+
+def test_gzip_encoded_response_is_decompressed(pypi_versions, fake_pypi):
+    connection = fake_pypi(
+        FakeResponse(
+            200,
+            gzip.compress(release_document({"1.0": [release_file()]})),
+            headers={"Content-Encoding": "gzip"},
+        )
+    )
+
+    assert pypi_versions.get_release_versions("pkg") == ["1.0"]
+    assert connection.requests[0][2]["Accept-Encoding"] == "gzip"
+
+
+def test_redirect_is_followed(pypi_versions, fake_pypi):
+    connection = fake_pypi(
+        FakeResponse(
+            301,
+            headers={"Location": "https://pypi.org/pypi/foo-bar/json"},
+            reason="Moved Permanently",
+        ),
+        FakeResponse(200, release_document({"1.0": [release_file()]})),
+    )
+
+    assert pypi_versions.get_release_versions("Foo_Bar") == ["1.0"]
+    assert [path for _, path, _ in connection.requests] == [
+        "/pypi/Foo_Bar/json",
+        "/pypi/foo-bar/json",
+    ]
+
+
+def test_too_many_redirects_returns_empty_list(pypi_versions, fake_pypi):
+    redirect = FakeResponse(
+        302, headers={"Location": "https://pypi.org/pypi/pkg/json"}, reason="Found"
+    )
+    fake_pypi(*[redirect] * (pypi_versions.MAX_REDIRECTS + 1))
+
+    assert pypi_versions.get_release_versions("pkg") == []
+
+
+def test_unknown_package_returns_empty_list_and_is_not_cached(
+    pypi_versions, fake_pypi
+):
+    fake_pypi(FakeResponse(404, reason="Not Found"))
+
+    assert pypi_versions.get_release_versions("missing") == []
+    assert not os.path.exists(pypi_versions._cache_path("missing"))
+
+
+def test_fresh_disk_entry_is_used_without_a_request(pypi_versions, fake_pypi):
+    pypi_versions._write_disk_cache("pkg", ["1.0", "2.0"], '"etag"')
+    connection = fake_pypi()
+
+    assert pypi_versions.get_release_versions("pkg") == ["1.0", "2.0"]
+    assert connection.requests == []
+
+
+def test_expired_entry_is_revalidated_with_its_etag(pypi_versions, fake_pypi):
+    pypi_versions._write_disk_cache("pkg", ["1.0", "2.0"], '"etag"')
+    expire(pypi_versions, "pkg")
+    connection = fake_pypi(FakeResponse(304, reason="Not Modified"))
+
+    assert pypi_versions.get_release_versions("pkg") == ["1.0", "2.0"]
+    assert connection.requests[0][2]["If-None-Match"] == '"etag"'
+    # The 304 restarts the entry's TTL
+    assert pypi_versions._read_disk_cache("pkg") == (["1.0", "2.0"], '"etag"', True)
+
+
+def test_expired_entry_is_replaced_when_releases_changed(pypi_versions, fake_pypi):
+    pypi_versions._write_disk_cache("pkg", ["1.0"], '"old"')
+    expire(pypi_versions, "pkg")
+    fake_pypi(
+        FakeResponse(
+            200,
+            release_document({"1.0": [release_file()], "2.0": [release_file()]}),
+            headers={"ETag": '"new"'},
+        )
+    )
+
+    assert pypi_versions.get_release_versions("pkg") == ["1.0", "2.0"]
+    assert pypi_versions._read_disk_cache("pkg") == (["1.0", "2.0"], '"new"', True)
+
+
+def test_expired_entry_is_used_when_revalidation_fails(
+    pypi_versions, fake_pypi, caplog
+):
+    pypi_versions._write_disk_cache("pkg", ["1.0", "2.0"], '"etag"')
+    expire(pypi_versions, "pkg")
+    fake_pypi(OSError("connection reset"), OSError("connection reset"))
+
+    assert pypi_versions.get_release_versions("pkg") == ["1.0", "2.0"]
+    assert [record.name for record in caplog.records] == ["pypi_versions"]
+    # Still expired, so the next run tries PyPI again
+    assert pypi_versions._read_disk_cache("pkg")[2] is False
+
+
+def test_request_is_retried_once_on_a_fresh_connection(pypi_versions, fake_pypi):
+    connection = fake_pypi(
+        ConnectionResetError("idle connection closed"),
+        FakeResponse(200, release_document({"1.0": [release_file()]})),
+    )
+
+    assert pypi_versions.get_release_versions("pkg") == ["1.0"]
+    assert len(connection.requests) == 2
+
+
+def test_release_version_index_lists_versions_in_the_same_order(
+    pypi_versions, fake_pypi
+):
+    fake_pypi(
+        FakeResponse(
+            200,
+            release_document({"1.10": [release_file()], "1.9": [release_file()]}),
+        )
+    )
+
+    versions, parsed_only = pypi_versions.get_release_version_index("pkg")
+
+    assert [ver for _, ver in versions] == ["1.9", "1.10"]
+    assert parsed_only == tuple(version for version, _ in versions)